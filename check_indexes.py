@@ -0,0 +1,97 @@
+import os
+import sys
+import argparse
+from utils.file import File
+from utils.config import ConfigHelper as ch
+from utils.index.index_helper import IndexHelper as ih
+
+'''
+check_indexes.py
+
+Read-only check for git pre-commit hooks. Classifies only the given paths and the directories above them, and exits
+with 1 and a report if any of them isn't properly indexed. Nothing is renamed and no directory is listed, so the check
+takes the same time on any vault size. It can't tell whether siblings are numbered without gaps, which needs a listing
+of their directory; the next fix_indexes.py run takes care of that.
+
+Usage:
+git diff --cached --name-only --diff-filter=d -z | python check_indexes.py <root_path> -z
+python check_indexes.py <root_path> <path> [<path> ...]
+
+Paths are relative to the vault, or absolute.
+'''
+
+def check_path(root_file, abs_path, checked_paths):
+    '''Returns (path, problem) for the path and each directory above it that isn't properly indexed'''
+    relative_path = os.path.relpath(abs_path, root_file.get_abs_path())
+    if relative_path == os.curdir or relative_path.startswith(os.pardir):
+        return []
+
+    problems = []
+    parts = relative_path.split(os.sep)
+    for level in range(len(parts)):
+        file = File.from_abs_path(os.path.join(root_file.get_abs_path(), *parts[:level + 1]), level)
+        if level == 0 and not ih.is_area(file, proper = True):
+            return problems # Only areas are indexed
+        if ch.excluded_from_indexing(file):
+            return problems # Neither it nor anything below it is indexed
+
+        file_path = file.get_abs_path()
+        if file_path in checked_paths:
+            continue
+        checked_paths.add(file_path)
+
+        problem = _get_problem(file)
+        if problem is not None:
+            problems.append((os.path.join(*parts[:level + 1]), problem))
+    return problems
+
+def _get_problem(file):
+    if not ih.is_index(file, proper = True):
+        return "improperly indexed" if ih.is_index(file, proper = False) else "not indexed"
+
+    # The index type only depends on the parent's type, so the parent's index itself is compared here
+    jd_index = ih.get_jd_index(file)
+    parent_jd_index = ih.get_jd_index(file.get_parent())
+    if jd_index is not None and parent_jd_index is not None and jd_index.parent() != parent_jd_index:
+        return f"index {jd_index} doesn't belong in {parent_jd_index}"
+    return None
+
+def check_paths(root_path, paths):
+    '''Returns (path relative to the vault, problem) for every problem found, in the order of the paths'''
+    root_file = File.from_abs_path(os.path.abspath(root_path), -1)
+    checked_paths = set() # Staged files share most of their ancestors
+    problems = []
+    for path in paths:
+        abs_path = os.path.normpath(os.path.join(root_file.get_abs_path(), path))
+        if File.from_abs_path(abs_path).exists():
+            problems += check_path(root_file, abs_path, checked_paths)
+    return problems
+
+def read_paths(stdin, null_separated):
+    separator = "\0" if null_separated else "\n"
+    return [path for path in stdin.read().split(separator) if path.strip()]
+
+def run_check(root_path, paths):
+    '''Prints a report of the problems. Returns the exit code'''
+    problems = check_paths(root_path, paths)
+    for path, problem in problems:
+        print(f"{path}: {problem}")
+    if problems:
+        print(f"{len(problems)} paths aren't properly indexed. Run fix_indexes.py on the vault, then stage the renames.")
+        return 1
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="check_indexes.py", description="Checks that the given paths are properly indexed.")
+    parser.add_argument("root_path", help="Vault the paths belong to")
+    parser.add_argument("paths", nargs="*", metavar="path", help="Paths to check (default: read from stdin)")
+    parser.add_argument("-z", dest="null_separated", action="store_true", help="Paths on stdin are separated by NUL, as printed by git -z")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    paths = args.paths or read_paths(sys.stdin, args.null_separated)
+    sys.exit(run_check(args.root_path, paths))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
+import re
 import sys
-from utils.file import File
+from utils.file import File, CreationRegistry, TreeFingerprint
 from utils.index.index_helper import IndexHelper as ih
 from utils.config.config_helper import ConfigHelper as ch
+from utils.run import ChangeLog, RunLog, RunMetrics
 from datetime import datetime
 
+_NOT_INDEXED_MARKER = "**(NOT INDEXED)**"
+# Follows a directory below jdex_max_depth, whose contents the JDex doesn't list
+_NOT_INDEXED_BELOW_PATTERN = re.compile(r"\*\*\((\d+) NOT INDEXED below\)\*\*")
+
 def _should_exclude(file):
     if file.level == 0 and not ih.is_area(file, proper = True): # De-clutter base directory by removing non-areas
         return True
@@ -12,58 +18,162 @@ def _should_exclude(file):
 
     return False
 
-def _print_line(file, base_level):
+def _is_not_indexed(file):
+    return not ih.is_index(file, proper = True) and not ch.excluded_from_indexing(file)
+
+def _get_jdex_file(dir_file):
+    return dir_file.create_child(f"Index of {dir_file.name}.md")
+
+def _is_shard(file, shard):
+    '''Whether file is a category with a JDex of its own, which the JDex files above link to instead of listing it'''
+    return shard and file.level == 1 and file.is_dir()
+
+def _count_not_indexed(markdown_content):
+    return markdown_content.count(_NOT_INDEXED_MARKER) + sum(int(count) for count in _NOT_INDEXED_BELOW_PATTERN.findall(markdown_content))
+
+def _print_line(file, base_level, shard=False, num_not_indexed_below=0):
     indent = "    " * (file.level - base_level - 1)
     markdown_content = f"{indent}{file.level}. "
     
     if file.is_dir():
         markdown_content += f"**{file.name}** "
+        if _is_shard(file, shard):
+            markdown_content += f"[[Index of {file.name}|JDex]] "
     else:
         markdown_content += f"[[{file.name}]] "
 
-    if not ih.is_index(file, proper = True) and not ch.excluded_from_indexing(file):
-        markdown_content += "**(NOT INDEXED)** "
+    if _is_not_indexed(file):
+        markdown_content += f"{_NOT_INDEXED_MARKER} "
+    if num_not_indexed_below:
+        markdown_content += f"**({num_not_indexed_below} NOT INDEXED below)** "
 
     markdown_content += "\n"
     return markdown_content
 
-def _traverse_dir(parent_file, base_level) -> str:
+def _traverse_dir(parent_file, base_level, shard=False, max_depth=None):
     """
-    Recursively traverse the directory and generate markdown content.
+    Yields the markdown lines of everything below parent_file, depth first. Uses a stack of child iterators instead
+    of recursion, so deep trees can't hit the recursion limit and only one listing per level is held at a time.
+    Categories with a JDex of their own (shard), directories max_depth levels below parent_file and directories that
+    were already listed through another path, e.g. a symlink, aren't descended into. The NOT INDEXED files below a
+    directory at max_depth are counted on its line instead.
     """
-    markdown_content = ""
-    for file in parent_file.get_children():
+    visited_ids = {parent_file.get_file_id()}
+    stack = [iter(parent_file.get_children())]
+    while stack:
+        file = next(stack[-1], None)
+        if file is None:
+            stack.pop()
+            continue
+        if _should_exclude(file):
+            continue
+
+        descend = False
+        num_not_indexed_below = 0
+        if file.is_dir() and not _is_shard(file, shard):
+            file_id = file.get_file_id()
+            if file_id not in visited_ids:
+                visited_ids.add(file_id)
+                if max_depth is None or file.level - base_level < max_depth:
+                    descend = True
+                else:
+                    num_not_indexed_below = _count_not_indexed_below(file, visited_ids)
+
+        yield _print_line(file, base_level, shard, num_not_indexed_below)
+        if descend:
+            stack.append(iter(file.get_children()))
+
+def _count_not_indexed_below(dir_file, visited_ids):
+    '''Counts what a JDex without max_depth would mark NOT INDEXED below dir_file'''
+    num_not_indexed = 0
+    stack = [iter(dir_file.get_children())]
+    while stack:
+        file = next(stack[-1], None)
+        if file is None:
+            stack.pop()
+            continue
         if _should_exclude(file):
             continue
-        markdown_content += _print_line(file, base_level)
+
+        num_not_indexed += _is_not_indexed(file)
         if file.is_dir():
-            markdown_content += _traverse_dir(file, base_level)
-    
-    return markdown_content
+            file_id = file.get_file_id()
+            if file_id not in visited_ids:
+                visited_ids.add(file_id)
+                stack.append(iter(file.get_children()))
+    return num_not_indexed
 
-def _generate_markdown_index(file: str) -> None:
+def _delete_jdex_files(dir_file):
+    for child_file in dir_file.get_children():
+        if child_file.name.startswith("Index of ") and child_file.name.endswith(".md"):
+            ChangeLog.record(child_file)
+            child_file.delete()
+
+def _generate_markdown_index(file: str, shard=False, max_depth=None) -> None:
     """
-    Generates a markdown index of the directory structure.
+    Generates a markdown index of the directory structure. Returns the number of files it marks NOT INDEXED, including
+    those it counts below max_depth.
     """
     markdown_content = f"> [!info] **Generated on**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    markdown_content += _traverse_dir(file, file.level)
+    markdown_content += "".join(_traverse_dir(file, file.level, shard, max_depth))
     
-    for child_file in file.get_children():
-        if child_file.name.startswith("Index of ") and child_file.name.endswith(".md"):
-            child_file.delete()
+    _delete_jdex_files(file)
+    output_file = _get_jdex_file(file)
+    output_file.write_text(markdown_content)
+    ChangeLog.record(output_file)
+    return _count_not_indexed(markdown_content)
 
-    output_file = file.create_child(f"Index of {file.name}.md")
-    with open(output_file.get_abs_path(), "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+def create_jdex(root_file, area_files=None, fingerprints=None):
+    """
+    Regenerates the JDex of root_file and of the given areas (all areas by default), and with jdex_shard_by_category
+    the JDex of each of their categories. JDex files whose directory fingerprints prove unchanged since the last
+    completed run are kept as they are.
+
+    When all areas are covered, the NOT INDEXED files are counted per area from the area and category JDex files,
+    which don't overlap, as they are generated. The counts of a kept JDex are read back from it, so counting only
+    walks what the regenerated JDex files list and, with jdex_max_depth, what they count below it.
+    """
+    shard = ch.load_from_config("jdex_shard_by_category")
+    max_depth = ch.load_from_config("jdex_max_depth")
+    counts_not_indexed = area_files is None
+    if counts_not_indexed:
+        RunMetrics.start_not_indexed_count()
+        area_files = ih.get_areas_in_dir(root_file)
 
-def create_jdex(root_file):
-    area_files = ih.get_areas_in_dir(root_file)
-    
     files_to_index = [root_file] + area_files
-    print("Updating all JIndexes.")
+    if shard:
+        files_to_index += [child_file for area_file in area_files for child_file in area_file.get_children() if _is_shard(child_file, shard) and not _should_exclude(child_file)]
     for file in files_to_index:
-        _generate_markdown_index(file)
-    print("JIndexes Updated.")
+        jdex_file = _get_jdex_file(file)
+        if fingerprints is not None and fingerprints.is_unchanged(file) and jdex_file.exists():
+            RunMetrics.increment("jdex_files_skipped")
+            RunLog.log("debug", "jdex_skipped", path=jdex_file.get_abs_path())
+            num_not_indexed = _count_not_indexed(jdex_file.read_text()) if counts_not_indexed and file.level >= 0 else 0
+        else:
+            if file.level == 0 and not shard:
+                for child_file in file.get_children():
+                    if child_file.is_dir():
+                        _delete_jdex_files(child_file) # Shards left from when jdex_shard_by_category was on
+            num_not_indexed = _generate_markdown_index(file, shard, max_depth)
+            RunMetrics.increment("jdex_files_written")
+            RunLog.log("debug", "jdex_written", path=jdex_file.get_abs_path())
+
+        if counts_not_indexed and file.level >= 0: # The vault's JDex repeats what the others list
+            area_name = file.name if file.level == 0 else file.get_parent().name
+            RunMetrics.count_not_indexed(area_name, num_not_indexed) # Areas without NOT INDEXED files are reported as well
+
+def regenerate_jdex(root_file, area_files=None):
+    """
+    Regenerates JDex files outside the jdex stage (all of them by default). The stage's fingerprints must not vouch
+    for JDex files written for another tree, so a full regeneration is recorded as a completed jdex stage, and the
+    fingerprints of the directories of a partial one are forgotten.
+    """
+    fingerprints = TreeFingerprint(root_file, "jdex")
+    create_jdex(root_file, area_files)
+    if area_files is None:
+        fingerprints.save()
+    else:
+        fingerprints.forget(area_files)
 
 def main():
     if len(sys.argv) != 2:
@@ -72,7 +182,10 @@ def main():
     root_path = sys.argv[1]
     root_file = File.from_abs_path(root_path, -1)
     
-    create_jdex(root_file)
+    regenerate_jdex(root_file)
+    CreationRegistry.flush()
+    ChangeLog.flush(root_file)
+    print("JIndexes Updated.")
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,18 @@
 import sys
-from collections import deque
-from utils.file import File
+import heapq
+import queue
+import argparse
+import itertools
+import threading
+from functools import partial
+from utils.file import File, CreationRegistry, TreeFingerprint, FileSystem, InMemoryFileSystem
 from utils.config import ConfigHelper as ch
 from utils.obsidian import ObsidianFixer as of
 from utils.index.index_fixer import IndexFixer as idx_f
 from utils.index.index_helper import IndexHelper as ih
-from create_jdex import create_jdex
+from utils.run import ChangeLog, PendingLinks, RenameJournal, ResumeQueue, RunLock, RunLog, RunMetrics, SpillQueue, Deadline
+from utils.pipeline import ConcurrentStages, VaultPool
+from create_jdex import create_jdex, regenerate_jdex
 
 '''
 fix_indexes.py
@@ -16,19 +23,34 @@ This script manages and corrects file indexes in a hierarchical directory system
 2. Constructs new indexes by appending parent and main indexes with appropriate separators.
 3. Proposes updates for file names when their indexes are incorrect.
 4. Interactively prompts the user to approve renaming of files to maintain integrity.
-5. Uses a breadth-first search to process files iteratively, starting from the root directory.
+5. Uses a breadth-first search to process files iteratively, one directory at a time, starting from the root directory.
 
 Key Components:
 - ProposedChange: Tracks old and new file states during index corrections.
 - compute_parent_index: Retrieves the index of a file's parent.
 - compute_main_index: Assigns a unique and properly formatted main index to a file.
 - append_indexes: Combines parent and main indexes to form the complete index.
+- iter_dirs_breadth_first: Streams the directories of the hierarchy without recursion.
 - bfs_fix_indexes: Performs breadth-first search to apply index corrections across files.
+- fix_dir_indexes: Applies the index corrections of a single directory.
+- propose_dir_renames / apply_renames: Compute and apply the renames of a directory, which the approval modes ask about in between.
+- fix_weblinks: Rewrites the wikilinks of all renamed files in a single pass.
 
 Usage:
 Run the script to automatically process and correct indexes in a specified directory hierarchy.
+With --deadline (e.g. --deadline 25m) it stops at the deadline and the next run resumes where it stopped.
+Several vaults can be given (or listed under 'vaults' in config.yaml); they are then processed concurrently.
 '''
 
+# Renames journaled with one fsync
+_RENAME_BATCH_SIZE = 1000
+
+# How often quitting the directory approval checks whether the precompute worker is still running
+_DRAIN_POLL_SECONDS = 0.1
+
+# How prompt_for_approval asks: once per rename, once per directory or once for the whole plan
+_APPROVAL_MODES = ["file", "directory", "plan"]
+
 class ProposedChange:
     def __init__(self, old_file, new_file):
         self.old_file = old_file
@@ -65,44 +87,481 @@ def prompt_user(old_file, new_file):
         else:
             print("Invalid input. Please enter 'y' or 'n'.")
 
-def bfs_fix_indexes(root_file, area_files):
-    queue = deque(area_files)
-
-    while queue:
-        proposed_changes = []
-        for _ in range(len(queue)):
-            parent_file = queue.popleft()
-            for file in parent_file.get_children():
-                if file.is_dir():
-                    queue.append(file)
-                proposal = propose_index_update(file)
-                if proposal is not None:
-                    proposed_changes.append(proposal)
-
-        proposed_changes.sort(key=lambda proposal: proposal.new_file)
-        for proposal in proposed_changes:
-            old_file = proposal.old_file
-            new_file = proposal.new_file
-
-            if ch.load_from_config("prompt_for_approval"):
+def prompt_directory(dir_file, proposals):
+    '''Shows all renames of a directory at once. Returns "y" (apply), "s" (skip), "a" (apply all remaining) or "q" (quit)'''
+    print(f"\n{dir_file.get_abs_path()}: {len(proposals)} renames")
+    for old_file, new_file in proposals:
+        print(f"  '{old_file.name}' => '{new_file.name}'")
+
+    while True:
+        user_input = input("Apply? (y)es, (s)kip this directory, (a)ll remaining, (q)uit: ").strip().lower()
+        if user_input in ("y", "s", "a", "q"):
+            return user_input
+        print("Invalid input. Please enter 'y', 's', 'a' or 'q'.")
+
+def get_approval_mode():
+    '''None when renames are applied without asking'''
+    if not ch.load_from_config("prompt_for_approval"):
+        return None
+    approval_mode = ch.load_from_config("approval_mode")
+    if approval_mode not in _APPROVAL_MODES:
+        raise ValueError(f"Invalid approval_mode {approval_mode}. Valid modes are {_APPROVAL_MODES}")
+    return approval_mode
+
+def check_deadline_supported(deadline):
+    '''Raises a ValueError if deadline is given with an approval mode that works through the whole fix at once'''
+    approval_mode = get_approval_mode()
+    if deadline is not None and approval_mode in ("directory", "plan"):
+        raise ValueError(f"--deadline can't be used with approval_mode {approval_mode}. Use approval_mode file or turn prompt_for_approval off")
+
+def iter_dirs_breadth_first(dir_files, fingerprints=None):
+    '''
+    Yields the given directories and every directory below them, breadth first, skipping subtrees that fingerprints
+    prove unchanged. A directory's subdirectories are only listed once the caller resumes the generator, so they are
+    seen under the names the caller gave them. Pending directories are spilled to disk beyond the memory budget.
+    A directory reached through several paths, e.g. symlinks, is only yielded the first time.
+    '''
+    visited_ids = set()
+    with SpillQueue(ch.load_from_config("max_entries_in_memory")) as queue:
+        for dir_file in dir_files:
+            queue.append([dir_file.get_abs_path(), dir_file.level])
+
+        while queue:
+            abs_path, level = queue.popleft()
+            dir_file = File.from_abs_path(abs_path, level)
+            if not _first_visit(dir_file, visited_ids):
+                continue
+            if fingerprints is not None and fingerprints.is_unchanged(dir_file):
+                RunMetrics.increment("directories_skipped")
+                continue
+
+            RunMetrics.increment("directories_scanned")
+            yield dir_file
+            for child_file in dir_file.get_children():
+                if child_file.is_dir():
+                    queue.append([child_file.get_abs_path(), child_file.level])
+
+def iter_dirs_by_priority(root_file, dir_files, deadline, fingerprints=None):
+    '''
+    Like iter_dirs_breadth_first, but yields the most recently modified pending directory first, after the directories
+    the last run didn't get to, and stops once the deadline passed. The directories still pending then are saved for
+    the next run and don't count as fixed for the fingerprints. Pending directories are held in memory.
+    The directories the last run didn't get to are reached from their areas like any other, with their ancestors
+    going first as well, so they are never fixed under a name that one of their ancestors loses later in the run.
+    '''
+    pending_dirs = [] # Heap of (not resumed, -modified time, sequence number, path, level)
+    sequence_numbers = itertools.count()
+    resumed_ids = set() # Of the directories the last run didn't get to and of their ancestors, which survive renames
+    def push(dir_file):
+        resumed = bool(resumed_ids) and dir_file.get_file_id() in resumed_ids
+        heapq.heappush(pending_dirs, (not resumed, -dir_file.get_modified_time(), next(sequence_numbers), dir_file.get_abs_path(), dir_file.level))
+
+    for dir_file in ResumeQueue.pop_all(root_file):
+        while dir_file.level >= 0 and dir_file.exists(): # Unless renamed or removed since
+            resumed_ids.add(dir_file.get_file_id())
+            dir_file = dir_file.get_parent()
+    for dir_file in dir_files:
+        push(dir_file)
+
+    visited_paths = {} # File id -> path it was yielded under
+    while pending_dirs:
+        if deadline.has_passed():
+            remaining_dirs = [File.from_abs_path(abs_path, level) for *_, abs_path, level in sorted(pending_dirs)]
+            ResumeQueue.save(root_file, remaining_dirs)
+            _mark_unfixed(fingerprints, remaining_dirs)
+            print(f"Deadline reached, {len(remaining_dirs)} directories are left for the next run.")
+            RunLog.log("info", "deadline_reached", directories_left=len(remaining_dirs))
+            return
+
+        *_, abs_path, level = heapq.heappop(pending_dirs)
+        dir_file = File.from_abs_path(abs_path, level)
+        file_id = dir_file.get_file_id()
+        if file_id in visited_paths:
+            if not File.from_abs_path(visited_paths[file_id]).exists():
+                _mark_unfixed(fingerprints, [dir_file]) # Fixed under a parent name that changed since
+            continue # Reached through several paths
+        visited_paths[file_id] = abs_path
+        if fingerprints is not None and fingerprints.is_unchanged(dir_file):
+            RunMetrics.increment("directories_skipped")
+            continue
+
+        RunMetrics.increment("directories_scanned")
+        yield dir_file
+        for child_file in dir_file.get_children():
+            if child_file.is_dir():
+                push(child_file)
+
+def _first_visit(file, visited_ids):
+    '''Whether what file resolves to wasn't visited yet, and records it as visited'''
+    file_id = file.get_file_id()
+    if file_id in visited_ids:
+        return False
+    visited_ids.add(file_id)
+    return True
+
+def bfs_fix_indexes(root_file, area_files, fingerprints=None, deadline=None, interactive=True):
+    '''
+    Renames every incorrectly indexed file below the areas. Directories that fingerprints prove unchanged since the last
+    completed fix are skipped along with everything below them. With a deadline, recently modified directories go
+    first and the fix stops at the deadline, to be resumed by the next run. A fix without a deadline that covers all
+    areas makes the directories an earlier time-boxed fix didn't get to moot. Unless interactive, renames are applied
+    without asking whatever prompt_for_approval says. Returns the applied renames as a SpillQueue of [old path, new path].
+    '''
+    approval_mode = None
+    if interactive:
+        check_deadline_supported(deadline)
+        approval_mode = get_approval_mode()
+    renames = SpillQueue(ch.load_from_config("max_entries_in_memory"))
+    RunLog.record_renames(renames)
+    if approval_mode == "directory":
+        _fix_with_directory_approval(area_files, fingerprints, renames)
+        return renames
+    if approval_mode == "plan":
+        _fix_with_plan_approval(area_files, fingerprints, renames)
+        return renames
+
+    if deadline is None:
+        if _covers_all_areas(root_file, area_files):
+            ResumeQueue.discard(root_file)
+        dir_files = iter_dirs_breadth_first(area_files, fingerprints)
+    else:
+        dir_files = iter_dirs_by_priority(root_file, area_files, deadline, fingerprints)
+
+    for parent_file in dir_files:
+        fix_dir_indexes(parent_file, renames, prompt = approval_mode == "file")
+    return renames
+
+def _covers_all_areas(root_file, area_files):
+    area_paths = {area_file.get_abs_path() for area_file in area_files}
+    return all(area_file.get_abs_path() in area_paths for area_file in ih.get_areas_in_dir(root_file))
+
+def fix_dir_indexes(parent_file, renames, prompt=False):
+    '''Renames the incorrectly indexed children of one directory, asking for every rename if prompt, and adds them to renames'''
+    for batch in propose_dir_renames(parent_file):
+        if prompt:
+            for old_file, new_file in batch:
                 prompt_user(old_file, new_file)
+        renames.extend(apply_renames(batch))
+
+def propose_dir_renames(parent_file):
+    '''
+    Yields the renames the incorrectly indexed children of one directory need, as batches of (old_file, new_file).
+    Every proposal is computed before the first batch, as each depends on the names of all siblings. Proposals are
+    spilled to disk beyond the memory budget.
+    '''
+    with SpillQueue(ch.load_from_config("max_entries_in_memory")) as proposed_names:
+        for file in parent_file.get_children():
+            proposal = propose_index_update(file)
+            if proposal is not None:
+                proposed_names.append([proposal.old_file.name, proposal.new_file.name])
+                RunMetrics.increment("renames_proposed")
+
+        while proposed_names:
+            batch = []
+            while proposed_names and len(batch) < _RENAME_BATCH_SIZE:
+                old_name, new_name = proposed_names.popleft()
+                batch.append((parent_file.create_child(old_name), parent_file.create_child(new_name)))
+            yield batch
+
+def apply_renames(batch):
+    '''Journals a batch of (old_file, new_file) renames with one fsync, then applies them. Returns them as [old path, new path]'''
+    RenameJournal.log_renames(batch)
+    renames = []
+    for old_file, new_file in batch:
+        ChangeLog.record(old_file)
+        ChangeLog.record(new_file)
+        renames.append([old_file.get_abs_path(), new_file.get_abs_path()])
+        old_file.rename(new_file)
+        RunMetrics.increment("renames_applied")
+    return renames
+
+def _fix_with_directory_approval(area_files, fingerprints, renames):
+    '''
+    Asks once per directory, showing all of its renames, and applies or skips them together. A background thread
+    computes the renames of the next directories while the user reads. The directories below skipped renames aren't
+    visited, and neither they nor anything left after quitting count as fixed for the fingerprints.
+    '''
+    vault_lock = threading.Lock() # Held while the vault or the caches are used, so never while waiting for input
+    pending_dirs = queue.Queue()
+    proposals = queue.Queue()
+    stopped = threading.Event()
+
+    def precompute():
+        visited_ids = set()
+        while not stopped.is_set():
+            dir_file = pending_dirs.get()
+            if dir_file is None:
+                return
+            try:
+                with vault_lock:
+                    dir_proposals = None
+                    if not _first_visit(dir_file, visited_ids):
+                        pass # Reached through several paths
+                    elif fingerprints is not None and fingerprints.is_unchanged(dir_file):
+                        RunMetrics.increment("directories_skipped")
+                    else:
+                        RunMetrics.increment("directories_scanned")
+                        dir_proposals = [proposal for batch in propose_dir_renames(dir_file) for proposal in batch]
+            except Exception as e:
+                proposals.put((dir_file, e))
+                return
+            proposals.put((dir_file, dir_proposals))
+
+    worker = threading.Thread(target=precompute, daemon=True)
+    worker.start()
+    for dir_file in area_files:
+        pending_dirs.put(dir_file)
+    num_pending = len(area_files)
+
+    approve_all = False
+    try:
+        while num_pending:
+            dir_file, dir_proposals = proposals.get()
+            num_pending -= 1
+            if isinstance(dir_proposals, Exception):
+                raise dir_proposals
+            if dir_proposals is None:
+                continue # Unchanged since the last completed fix
+
+            answer = "y"
+            if dir_proposals and not approve_all:
+                answer = prompt_directory(dir_file, dir_proposals)
+            if answer == "q":
+                print("Stopping. The renames applied so far are kept.")
+                _mark_unfixed(fingerprints, [dir_file] + _drain(proposals, pending_dirs, num_pending, worker))
+                break
+            approve_all = approve_all or answer == "a"
 
-            if ch.load_from_config("fix_weblinks"):
-                of.update_weblinks(root_file, old_file, new_file)
+            with vault_lock:
+                skipped_paths = set()
+                if answer == "s":
+                    skipped_paths = {old_file.get_abs_path() for old_file, _ in dir_proposals}
+                    _mark_unfixed(fingerprints, [dir_file])
+                else:
+                    renames.extend(apply_renames(dir_proposals))
 
-            old_file.rename(new_file)
+                for child_file in dir_file.get_children():
+                    if child_file.is_dir() and child_file.get_abs_path() not in skipped_paths:
+                        pending_dirs.put(child_file)
+                        num_pending += 1
+    finally:
+        stopped.set()
+        pending_dirs.put(None)
+        worker.join()
+
+def _drain(proposals, pending_dirs, num_pending, worker):
+    '''Directories that are still pending after quitting, including those a worker that stopped on an error never got to'''
+    dir_files = []
+    while len(dir_files) < num_pending:
+        try:
+            dir_files.append(proposals.get(timeout=_DRAIN_POLL_SECONDS)[0])
+        except queue.Empty:
+            if not worker.is_alive() and proposals.empty():
+                break
+    if not worker.is_alive():
+        while not pending_dirs.empty():
+            dir_files.append(pending_dirs.get())
+    return dir_files
+
+def _fix_with_plan_approval(area_files, fingerprints, renames):
+    '''Works out every rename the fix would apply on a copy of the tree in memory, and asks once for the whole plan'''
+    plan = _simulate_renames(area_files, fingerprints)
+    if not plan:
+        return
+
+    dir_path = None
+    for old_file, new_file in plan:
+        if old_file.dir_path != dir_path:
+            dir_path = old_file.dir_path
+            print(f"\n{dir_path}:")
+        print(f"  '{old_file.name}' => '{new_file.name}'")
+
+    while True:
+        user_input = input(f"\nApply these {len(plan)} renames? (y/n): ").strip().lower()
+        if user_input == "y":
+            break
+        if user_input == "n":
+            print("Skipping all renames.")
+            _mark_unfixed(fingerprints, area_files)
+            return
+        print("Invalid input. Please enter 'y' or 'n'.")
+
+    # Applied a directory at a time, as renames below a directory are planned under the directory's new name. Each
+    # rename is checked once the renames before it that touch its names are applied, as they may free its new name
+    cut_short_dirs = []
+    batch = []
+    batch_paths = set()
+    for old_file, new_file in plan + [(None, None)]:
+        if batch and (old_file is None or old_file.dir_path != batch[-1][0].dir_path or len(batch) == _RENAME_BATCH_SIZE
+                      or old_file.get_abs_path() in batch_paths or new_file.get_abs_path() in batch_paths):
+            renames.extend(apply_renames(batch))
+            batch = []
+            batch_paths = set()
+        if old_file is None:
+            break
+        if old_file.exists() and not new_file.exists():
+            batch.append((old_file, new_file))
+            batch_paths.update([old_file.get_abs_path(), new_file.get_abs_path()])
+        else:
+            print(f"Skipping '{old_file.get_abs_path()}' => '{new_file.name}', it was changed since the plan was made.")
+            RunLog.log("warning", "planned_rename_skipped", path=old_file.get_abs_path(), new_name=new_file.name)
+            cut_short_dirs.append(old_file.get_parent())
+    _mark_unfixed(fingerprints, cut_short_dirs)
+
+def _simulate_renames(area_files, fingerprints):
+    '''
+    Fixes a copy of the areas' tree (names, types and the creation times that order unindexed files) in memory and
+    returns the renames in the order they were applied. Nothing is journaled or logged, and the vault isn't touched.
+    '''
+    mirror = InMemoryFileSystem()
+    stack = list(area_files)
+    visited_ids = set()
+    while stack:
+        file = stack.pop()
+        if file.name.startswith("."):
+            continue # Hidden files and creation registry sidecars are never renamed
+        if file.is_dir():
+            if not _first_visit(file, visited_ids):
+                continue # Fixed through the first path that reaches it
+            mirror.add_dir(file.get_abs_path())
+            stack.extend(file.get_children())
+        else:
+            orders_by_creation = ih.get_main_sort_key(file) == ih.NOT_INDEXED_SORT_KEY and not ch.excluded_from_indexing(file)
+            mirror.add_file(file.get_abs_path(), creation_time = file.get_creation_time() if orders_by_creation else 0.0)
+
+    file_system = FileSystem.get_active()
+    CreationRegistry.flush() # Switching backends drops what is cached about the vault
+    File.use_file_system(mirror)
+    plan = []
+    try:
+        for parent_file in iter_dirs_breadth_first(area_files, fingerprints):
+            for batch in propose_dir_renames(parent_file):
+                for old_file, new_file in batch:
+                    plan.append((old_file.create_copy(), new_file))
+                    old_file.rename(new_file)
+    finally:
+        File.use_file_system(file_system)
+    return plan
+
+def _mark_unfixed(fingerprints, dir_files):
+    if fingerprints is not None:
+        for dir_file in dir_files:
+            fingerprints.mark_incomplete(dir_file)
+
+def fix_weblinks(root_file, renames):
+    '''Rewrites the wikilinks of all renames, [old path, new path] in the order they were applied, in one pass over the vault'''
+    if ch.load_from_config("fix_weblinks"):
+        of.update_weblinks_for_renames(root_file, renames)
+    RenameJournal.mark_links_done()
+
+def fix_vault(root_path, deadline=None):
+    root_file = File.from_abs_path(root_path, -1)
+    RunMetrics.start()
+    status = "failed"
+    try:
+        status = "completed" if RunLock.run_coalesced(root_file, lambda: fix_vault_once(root_file, deadline), on_locked=lambda: RunLog.start(root_file)) else "skipped"
+        if status == "completed":
+            RunMetrics.write(root_file)
+    finally:
+        if not RunLog.is_open():
+            RunLog.start(root_file, rotate=False) # Another run holds the lock and may be writing the log
+        RunLog.finish(status)
+    return status
+
+def fix_vault_once(root_file, deadline=None):
+    RenameJournal.begin(root_file)
+    with RunMetrics.phase("fix"):
+        areas = ih.get_areas_in_dir(root_file)
+        fix_fingerprints = TreeFingerprint(root_file, "fix")
+        fix_fingerprints.update()
+        
+        pending_renames = PendingLinks.pop_all(root_file)
+        RenameJournal.log_pending_links(pending_renames)
+        renames = bfs_fix_indexes(root_file, areas, fix_fingerprints, deadline)
+        fix_fingerprints.save()
+
+    def fix_links():
+        with RunMetrics.phase("links"):
+            fix_weblinks(root_file, itertools.chain(pending_renames, renames))
+
+    def fix_jdex():
+        if deadline is not None and deadline.has_passed():
+            print("Deadline reached, the JDex files are left for the next run.")
+            RunLog.log("info", "jdex_deferred")
+            return
+        with RunMetrics.phase("jdex"):
+            jdex_fingerprints = TreeFingerprint(root_file, "jdex")
+            jdex_fingerprints.update()
+            create_jdex(root_file, fingerprints=jdex_fingerprints)
+            jdex_fingerprints.save()
+
+    # Wikilinks only change the contents of files and the JDex only their names, so both can run at once
+    ConcurrentStages.run([fix_links, fix_jdex])
+    CreationRegistry.flush()
+    ChangeLog.flush(root_file)
+    RenameJournal.end()
+
+def undo_last_run(root_path):
+    '''Renames back what the last run with renames renamed, and rewrites the wikilinks back. Returns False if locked'''
+    root_file = File.from_abs_path(root_path, -1)
+    lock = RunLock(root_file)
+    if not lock.acquire():
+        print(f"Another run is processing '{root_file}'. Retry later.")
+        return False
+
+    try:
+        RenameJournal.recover(root_file)
+        last_run = RenameJournal.get_last_run(root_file)
+        if last_run is None or last_run[1] is not None:
+            print(f"Nothing to undo in '{root_file}'.")
+            return True
+
+        run_id, _, renames = last_run
+        RenameJournal.begin(root_file, undo_of=run_id)
+        # Later renames may lie inside directories renamed earlier, so they are undone first. Each is checked right
+        # before it's undone, as undoing the one before may be what frees its old name
+        applied_renames = []
+        for old_path, new_path in reversed(renames):
+            old_file = File.from_abs_path(old_path)
+            new_file = File.from_abs_path(new_path)
+            if not new_file.exists() or old_file.exists():
+                print(f"Can't undo '{old_path}' => '{new_path}', it was changed since.")
+                continue
+
+            RenameJournal.log_renames([(new_file, old_file)])
+            ChangeLog.record(new_file)
+            ChangeLog.record(old_file)
+            applied_renames.append([new_file.get_abs_path(), old_file.get_abs_path()])
+            new_file.rename(old_file)
+
+        fix_weblinks(root_file, applied_renames)
+        regenerate_jdex(root_file)
+        CreationRegistry.flush()
+        ChangeLog.flush(root_file)
+        RenameJournal.end()
+        print(f"Undid {len(applied_renames)} renames of the run from {run_id}.")
+    finally:
+        lock.release()
+    return True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="fix_indexes.py", description="Fixes the indexes of the given vaults.")
+    parser.add_argument("root_paths", nargs="*", metavar="root_path",
+                        help="Vaults to process (default: the vaults listed in config.yaml)")
+    parser.add_argument("--deadline", type=Deadline.parse, default=None,
+                        help="Stop taking on work after this long, e.g. 25m, and resume where it stopped on the next run")
+    return parser.parse_args(argv)
 
 def main():
     '''Creating a main function to minimize the number of global variables'''
-    if len(sys.argv) != 2:
-        raise ValueError("Usage: python fix_indexes.py <root_path>")
-    
-    root_path = sys.argv[1]
-    root_file = File.from_abs_path(root_path, -1)
-    areas = ih.get_areas_in_dir(root_file)
-    
-    bfs_fix_indexes(root_file, areas)
-    create_jdex(root_file)
+    args = parse_args()
+    check_deadline_supported(args.deadline)
+    root_paths = VaultPool.get_root_paths(args.root_paths)
+    if not root_paths:
+        raise ValueError("Usage: python fix_indexes.py <root_path> [<root_path> ...] [--deadline 25m], or list the vaults in config.yaml")
+
+    if VaultPool.run(partial(fix_vault, deadline=args.deadline), root_paths, "fix_indexes"):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
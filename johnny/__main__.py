@@ -0,0 +1,111 @@
+import os
+import sys
+import argparse
+from functools import partial
+from utils.pipeline import Pipeline, VaultPool, STAGES
+from utils.run import Deadline
+
+'''
+python -m johnny
+
+Single entry point for the indexer. Every stage selected in one invocation runs in the same process and shares
+one snapshot of the vault, so cron only needs one line per schedule:
+
+python -m johnny run <root_path>                           Runs fix, links and jdex
+python -m johnny run <root_path> --stages fix,jdex,commit  Runs the given stages, always in pipeline order
+python -m johnny fix|links|jdex|commit <root_path>         Runs a single stage
+python -m johnny run <root_path> --deadline 25m            Stops at the deadline, the next run resumes where it stopped
+
+python -m johnny serve <root_path> [--socket PATH]         Serves JSON-RPC requests for the vault over a Unix socket
+python -m johnny undo-last-run <root_path>                 Renames back what the last run renamed
+python -m johnny check <root_path> [<path> ...] [-z]       Checks the given paths, e.g. staged files, without changing anything
+
+Several vaults can be given (or listed under 'vaults' in config.yaml); they are then processed concurrently.
+'''
+
+_DEFAULT_STAGES = "fix,links,jdex"
+
+_STAGE_HELP = {
+    "fix": "Rename incorrectly indexed files",
+    "links": "Rewrite wikilinks of renamed files",
+    "jdex": "Regenerate the JDex files",
+    "commit": "Commit the vault at most once a day",
+}
+
+def _add_common_arguments(parser):
+    parser.add_argument("root_paths", nargs="*", metavar="root_path",
+                        help="Vaults to process (default: the vaults listed in config.yaml)")
+    parser.add_argument("--changed-paths-only", action="store_true",
+                        help="commit: only stage the paths this indexer changed")
+    parser.add_argument("--enable-fscache", action="store_true",
+                        help="commit: enable git's untracked cache (and fsmonitor where available)")
+    parser.add_argument("--deadline", type=Deadline.parse, default=None,
+                        help="fix: stop taking on work after this long, e.g. 25m, and resume where it stopped on the next run")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="johnny", description="Johnny Decimal indexer.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run several stages in one process")
+    _add_common_arguments(run_parser)
+    run_parser.add_argument("--stages", default=_DEFAULT_STAGES,
+                            help=f"Comma separated stages out of {','.join(STAGES)} (default: {_DEFAULT_STAGES})")
+
+    for stage in STAGES:
+        _add_common_arguments(subparsers.add_parser(stage, help=_STAGE_HELP[stage]))
+
+    serve_parser = subparsers.add_parser("serve", help="Serve JSON-RPC requests for a vault over a Unix socket")
+    serve_parser.add_argument("root_path")
+    serve_parser.add_argument("--socket", dest="socket_path", default=None,
+                              help="Path of the Unix socket (default: logs/<vault>.sock)")
+
+    undo_parser = subparsers.add_parser("undo-last-run", help="Rename back what the last run renamed")
+    undo_parser.add_argument("root_paths", nargs="+", metavar="root_path")
+
+    check_parser = subparsers.add_parser("check", help="Check that the given paths and their directories are properly indexed")
+    check_parser.add_argument("root_path")
+    check_parser.add_argument("paths", nargs="*", metavar="path", help="Paths to check (default: read from stdin)")
+    check_parser.add_argument("-z", dest="null_separated", action="store_true",
+                              help="Paths on stdin are separated by NUL, as printed by git -z")
+
+    return parser.parse_args(argv)
+
+def run_vault(stages, changed_paths_only, enable_fscache, deadline, root_path):
+    return Pipeline(root_path, changed_paths_only, enable_fscache, deadline).run(stages)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        from utils.server import IndexServer
+        IndexServer(args.root_path, args.socket_path).serve_forever()
+        return
+
+    if args.command == "check":
+        from check_indexes import read_paths, run_check
+        sys.exit(run_check(args.root_path, args.paths or read_paths(sys.stdin, args.null_separated)))
+
+    if args.command == "undo-last-run":
+        from fix_indexes import undo_last_run
+        for root_path in args.root_paths:
+            undo_last_run(os.path.abspath(root_path))
+        return
+
+    if args.command == "run":
+        stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    else:
+        stages = [args.command]
+
+    if "fix" in stages:
+        from fix_indexes import check_deadline_supported
+        check_deadline_supported(args.deadline)
+
+    root_paths = VaultPool.get_root_paths(args.root_paths)
+    if not root_paths:
+        raise ValueError("No vaults given on the command line or in config.yaml")
+
+    process_vault = partial(run_vault, stages, args.changed_paths_only, args.enable_fscache, args.deadline)
+    if VaultPool.run(process_vault, root_paths, "johnny"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
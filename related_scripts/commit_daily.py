@@ -2,6 +2,8 @@
 
 import sys
 import os
+import fcntl
+import argparse
 import subprocess
 from datetime import datetime
 
@@ -11,30 +13,128 @@ crontab -e
 
 2. Add the following line to run the script every 5 minutes:
 */5 * * * * /usr/bin/python3 /path/to/commit_daily.py /path/to/repo >> /path/to/commit_daily.log 2>&1
+
+3. Optionally, skip ticks while the indexer is renaming files by passing its run lock (logs/<vault>.lock):
+*/5 * * * * /usr/bin/python3 /path/to/commit_daily.py /path/to/repo --lock-file /path/to/logs/<vault>.lock >> /path/to/commit_daily.log 2>&1
+
+4. Optionally, only stage the paths the indexer changed (written by fix_indexes.py to logs/changed_paths_<vault>.txt):
+*/5 * * * * /usr/bin/python3 /path/to/commit_daily.py /path/to/repo --changed-paths /path/to/logs/changed_paths_<vault>.txt >> /path/to/commit_daily.log 2>&1
 '''
 
-def run_command(command):
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-    output, error = process.communicate()
-    return output.decode('utf-8').strip(), error.decode('utf-8').strip()
+# Platforms where git ships a builtin fsmonitor daemon
+_FSMONITOR_PLATFORMS = ["darwin", "win32"]
 
-def check_and_commit(repo_path):
-    repo_name = os.path.basename(repo_path)
-    os.chdir(repo_path)
+def run_command(args, input=None):
+    """Runs a command from an argument list, optionally feeding it input. The error is only set if the command failed"""
+    try:
+        process = subprocess.run(args, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e: # Reported like a failed command, so a claimed change log is handed back rather than left behind
+        return "", f"'{args[0]}' couldn't be run: {e}"
+    output = process.stdout.decode('utf-8').strip()
+    if process.returncode == 0:
+        return output, ""
+    return output, process.stderr.decode('utf-8').strip() or f"'{' '.join(args)}' exited with {process.returncode}"
+
+def enable_fscache():
+    '''Lets git skip full work tree scans by caching untracked directories (and watching the tree where supported)'''
+    settings = [("core.untrackedCache", "true")]
+    if sys.platform in _FSMONITOR_PLATFORMS:
+        settings.append(("core.fsmonitor", "true"))
+
+    for key, value in settings:
+        current_value, _ = run_command(["git", "config", "--get", key])
+        if current_value != value:
+            run_command(["git", "config", key, value])
+
+def committed_today():
+    today = datetime.now().strftime("%Y-%m-%d")
+    last_commit_date, _ = run_command(["git", "log", "-1", "--format=%cd", "--date=short"])
+    return last_commit_date == today
 
+def read_changed_paths(changed_paths_file):
+    if not os.path.exists(changed_paths_file):
+        return []
+    with open(changed_paths_file, "r", encoding="utf-8") as f:
+        return sorted(set(line.rstrip("\n") for line in f if line.strip()))
+
+def _to_pathspec_input(paths):
+    '''NUL separated paths for --pathspec-from-file=-, as a rename of every note would overflow the argument list'''
+    return "\0".join(paths).encode("utf-8")
+
+def filter_stageable_paths(paths):
+    '''Drops paths that neither exist on disk nor are tracked, since git add fails on unmatched pathspecs'''
+    missing_paths = [path for path in paths if not os.path.lexists(path)]
+    if not missing_paths:
+        return paths
+
+    # Lists the whole index rather than the missing paths, which could overflow the argument list. Only the index is
+    # read, the work tree isn't scanned
+    tracked_output, _ = run_command(["git", "ls-files", "-z"])
+    tracked_paths = set() # Absolute, so either form of a path matches. Both git and the change log list them relative to the vault
+    for tracked_path in tracked_output.split("\0"):
+        while tracked_path:
+            tracked_paths.add(os.path.abspath(tracked_path))
+            tracked_path = os.path.dirname(tracked_path)
+
+    return [path for path in paths if os.path.lexists(path) or os.path.abspath(path) in tracked_paths]
+
+def stage_all():
     # Skip if there are no changes
-    status_output, _ = run_command("git status --porcelain")
+    status_output, _ = run_command(["git", "status", "--porcelain"])
     if not status_output:
+        return False
+
+    _, error = run_command(["git", "add", "."])
+    return not error
+
+def stage_changed_paths(changed_paths_file):
+    """Returns whether anything got staged, and the staging error if there was one"""
+    paths = filter_stageable_paths(read_changed_paths(changed_paths_file))
+    if not paths:
+        return False, ""
+
+    _, error = run_command(["git", "--literal-pathspecs", "add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                           input=_to_pathspec_input(paths))
+    if error:
+        return False, error
+
+    # Exits with 1 when something is staged
+    return subprocess.run(["git", "diff", "--cached", "--quiet"]).returncode == 1, ""
+
+def check_and_commit(repo_path, changed_paths_file=None, fscache=False):
+    repo_name = os.path.basename(repo_path)
+    if changed_paths_file is not None:
+        changed_paths_file = os.path.abspath(changed_paths_file)
+    os.chdir(repo_path)
+
+    if fscache:
+        enable_fscache()
+
+    # Skip if we committed today already. This is much cheaper than a status scan
+    if committed_today():
         return
 
-    # Skip if we committed today already
-    today = datetime.now().strftime("%Y-%m-%d")
-    last_commit_date, _ = run_command("git log -1 --format=%cd --date=short")
-    if last_commit_date == today:
+    # Claim the current change log so paths recorded during the commit land in a fresh one
+    claimed_paths_file = None
+    if changed_paths_file is not None:
+        if not os.path.exists(changed_paths_file):
+            return
+        claimed_paths_file = changed_paths_file + ".committing"
+        if os.path.exists(claimed_paths_file): # Left behind by an interrupted commit
+            _release_changed_paths(claimed_paths_file, changed_paths_file, keep=True)
+        os.replace(changed_paths_file, claimed_paths_file)
+        staged, error = stage_changed_paths(claimed_paths_file)
+        if not staged:
+            if error:
+                print(f"Error during staging: {error}")
+            _release_changed_paths(claimed_paths_file, changed_paths_file, keep=bool(error))
+            return
+    elif not stage_all():
         return
 
+    today = datetime.now().strftime("%Y-%m-%d")
     commit_message = f"Auto-commit: {today}"
-    _, error = run_command(f"git add . && git commit -m '{commit_message}'")
+    _, error = run_command(["git", "commit", "-m", commit_message])
 
     print(f"Attempting to commit changes in '{repo_name}' on '{today}'")
     if error:
@@ -43,12 +143,49 @@ def check_and_commit(repo_path):
         print(f"Changes committed with message: {commit_message}")
     print("")
 
+    if claimed_paths_file is not None:
+        _release_changed_paths(claimed_paths_file, changed_paths_file, keep=bool(error))
+
+def _release_changed_paths(claimed_paths_file, changed_paths_file, keep):
+    '''Deletes the claimed change log, or hands its paths back to the live log if the commit failed'''
+    if keep:
+        with open(claimed_paths_file, "r", encoding="utf-8") as claimed, open(changed_paths_file, "a", encoding="utf-8") as live:
+            live.write(claimed.read())
+    os.remove(claimed_paths_file)
+
+def try_lock(lock_path):
+    """Takes the indexer's run lock without blocking. Returns the locked file, or None if the indexer is running"""
+    lock_file = open(lock_path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
 def main():
-    if len(sys.argv) != 2:
-        raise ValueError("Usage: python commit_daily.py <repo_path>")
-    
-    repo_path = sys.argv[1]
-    check_and_commit(repo_path)
+    parser = argparse.ArgumentParser(description="Commit the changes in a repository at most once a day.")
+    parser.add_argument("repo_path")
+    parser.add_argument("--changed-paths", dest="changed_paths_file", default=None,
+                        help="Only stage the paths listed in this change log (written by fix_indexes.py)")
+    parser.add_argument("--enable-fscache", dest="fscache", action="store_true",
+                        help="Enable git's untracked cache (and fsmonitor where available) for the repository")
+    parser.add_argument("--lock-file", dest="lock_path", default=None,
+                        help="Skip this run while the indexer holds this run lock, so half-renamed trees aren't committed")
+    args = parser.parse_args()
+
+    if args.lock_path is None:
+        check_and_commit(args.repo_path, args.changed_paths_file, args.fscache)
+        return
+
+    lock_file = try_lock(args.lock_path)
+    if lock_file is None:
+        print(f"The indexer is processing '{args.repo_path}'. Skipping this run.")
+        return
+    try:
+        check_and_commit(args.repo_path, args.changed_paths_file, args.fscache)
+    finally:
+        lock_file.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+import pytest
+from utils.config import ConfigHelper as ch
+from utils.file import File, InMemoryFileSystem, RealFileSystem
+
+@pytest.fixture
+def memory_file_system():
+    """Empty in-memory backend for the vault at helpers.VAULT_PATH. Restores the real disk afterwards"""
+    file_system = InMemoryFileSystem()
+    File.use_file_system(file_system)
+    yield file_system
+    File.use_file_system(RealFileSystem())
+
+@pytest.fixture
+def config_overrides(monkeypatch):
+    """Config values that take precedence over config.yaml during the test, e.g. config_overrides["follow_symlinks"] = True"""
+    overrides = {}
+    load_from_config = ch.load_from_config
+    monkeypatch.setattr(ch, "load_from_config", staticmethod(lambda key: overrides[key] if key in overrides else load_from_config(key)))
+    return overrides
@@ -0,0 +1,2 @@
+# Where the tests' in-memory vaults live
+VAULT_PATH = "/vault"
@@ -0,0 +1,99 @@
+import os
+import threading
+import pytest
+import fix_indexes
+from utils.file import File, TreeFingerprint
+from utils.index.index_helper import IndexHelper as ih
+from utils.run import Deadline
+from fix_indexes import bfs_fix_indexes
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system):
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/A topic/note one.md", creation_time=1)
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md", creation_time=2)
+    return memory_file_system
+
+def _use_approval_mode(monkeypatch, config_overrides, approval_mode, answers):
+    config_overrides.update(prompt_for_approval=True, approval_mode=approval_mode)
+    answers = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+def _fix(file_system):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    return [(os.path.basename(old_path), os.path.basename(new_path)) for old_path, new_path in bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file))]
+
+def test_directory_mode_skips_the_subtree_of_skipped_directories(file_system, monkeypatch, config_overrides):
+    # 10-19 Work: apply, 10 Projects: skip, 11 Meetings: apply
+    _use_approval_mode(monkeypatch, config_overrides, "directory", ["y", "s", "y"])
+    assert _fix(file_system) == [("11 Projects", "10 Projects"), ("Meetings", "11 Meetings"), ("agenda.md", "11.00 agenda.md")]
+    assert file_system.is_file(f"{VAULT_PATH}/10-19 Work/10 Projects/A topic/note one.md")
+
+def test_directory_mode_applies_all_remaining(file_system, monkeypatch, config_overrides):
+    _use_approval_mode(monkeypatch, config_overrides, "directory", ["a"])
+    assert len(_fix(file_system)) == 5
+
+def test_directory_mode_quits_after_the_precompute_worker_failed(file_system, monkeypatch, config_overrides):
+    """Quitting doesn't wait for the directories a worker that stopped on an error never got to"""
+    file_system.add_file(f"{VAULT_PATH}/20-29 Life/note.md")
+    file_system.add_file(f"{VAULT_PATH}/30-39 Play/note.md")
+    propose_dir_renames = fix_indexes.propose_dir_renames
+    def failing_propose_dir_renames(parent_file):
+        if parent_file.name == "20-29 Life":
+            raise OSError("unreadable")
+        return propose_dir_renames(parent_file)
+    monkeypatch.setattr(fix_indexes, "propose_dir_renames", failing_propose_dir_renames)
+    _use_approval_mode(monkeypatch, config_overrides, "directory", ["q"])
+
+    fix = threading.Thread(target=_fix, args=(file_system,), daemon=True)
+    fix.start()
+    fix.join(timeout=5)
+    assert not fix.is_alive()
+
+def test_plan_mode_asks_once(file_system, monkeypatch, config_overrides):
+    _use_approval_mode(monkeypatch, config_overrides, "plan", ["n"])
+    assert _fix(file_system) == []
+    assert file_system.is_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md")
+
+    _use_approval_mode(monkeypatch, config_overrides, "plan", ["y"])
+    assert len(_fix(file_system)) == 5
+    assert file_system.is_file(f"{VAULT_PATH}/10-19 Work/11 Meetings/11.00 agenda.md")
+
+def test_plan_mode_applies_renames_that_free_each_others_names(file_system, monkeypatch, config_overrides):
+    topic_path = f"{VAULT_PATH}/10-19 Work/10 Team/10.00 Weekly"
+    file_system.add_file(f"{topic_path}/10.00-1 Meeting.md")
+    file_system.add_file(f"{topic_path}/10.00-2 Meeting.md")
+    _use_approval_mode(monkeypatch, config_overrides, "plan", ["y"])
+    _fix(file_system)
+    assert sorted(name for name, _ in file_system.list_dir(topic_path)) == ["10.00-0 Meeting.md", "10.00-1 Meeting.md"]
+
+def test_plan_mode_leaves_directories_changed_since_the_plan_unfixed(file_system, monkeypatch, config_overrides, tmp_path):
+    """A directory whose planned renames were skipped is scanned again by the next fix rather than skipped as fixed"""
+    topic_path = f"{VAULT_PATH}/10-19 Work/10 Team/10.00 Weekly"
+    file_system.add_file(f"{topic_path}/10.00-0 Meeting.md")
+    file_system.add_file(f"{topic_path}/10.00-2 Meeting.md")
+    monkeypatch.setattr(TreeFingerprint, "get_path", staticmethod(lambda root_file, stage: str(tmp_path / f"fingerprints_{stage}.json")))
+    _use_approval_mode(monkeypatch, config_overrides, "plan", [])
+    def answer(prompt):
+        file_system.add_file(f"{topic_path}/10.00-1 Meeting.md") # Takes the planned new name of 10.00-2
+        return "y"
+    monkeypatch.setattr("builtins.input", answer)
+
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    fingerprints = TreeFingerprint(root_file, "fix")
+    fingerprints.update()
+    bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file), fingerprints)
+    fingerprints.save()
+
+    fingerprints = TreeFingerprint(root_file, "fix")
+    fingerprints.update()
+    assert not fingerprints.is_unchanged(File.from_abs_path(topic_path))
+    assert fingerprints.is_unchanged(File.from_abs_path(f"{VAULT_PATH}/10-19 Work/12 Meetings"))
+
+@pytest.mark.parametrize("approval_mode", ["directory", "plan"])
+def test_whole_fix_modes_reject_a_deadline(file_system, monkeypatch, config_overrides, approval_mode):
+    _use_approval_mode(monkeypatch, config_overrides, approval_mode, [])
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    with pytest.raises(ValueError):
+        bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file), deadline=Deadline(60))
+    assert file_system.is_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md")
@@ -0,0 +1,32 @@
+import pytest
+from utils.file import File, CountingFileSystem
+from check_indexes import check_paths
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system):
+    file_system = CountingFileSystem(memory_file_system)
+    fs = file_system.file_system
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/11.01 Topic/11.01-0 note.md")
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/11.01 Topic/new note.md")
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/12.02 Misplaced/12.02-0 note.md")
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/.hidden/anything.md")
+    fs.add_file(f"{VAULT_PATH}/root note.md")
+    File.use_file_system(file_system)
+    return file_system
+
+def test_reports_paths_and_ancestors_without_listing(file_system):
+    problems = check_paths(VAULT_PATH, [
+        "10-19 Work/11 Projects/11.01 Topic/11.01-0 note.md",
+        "10-19 Work/11 Projects/11.01 Topic/new note.md",
+        "10-19 Work/11 Projects/12.02 Misplaced/12.02-0 note.md",
+        "10-19 Work/11 Projects/.hidden/anything.md",
+        "root note.md",
+        "10-19 Work/deleted.md",
+    ])
+
+    assert problems == [
+        ("10-19 Work/11 Projects/11.01 Topic/new note.md", "not indexed"),
+        ("10-19 Work/11 Projects/12.02 Misplaced", "index 12.02 doesn't belong in 11"),
+    ]
+    assert file_system.counts["list_dir"] == 0
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import pytest
+from utils.file import File
+from utils.run import ChangeLog
+from related_scripts import commit_daily
+
+@pytest.fixture
+def repo_path(tmp_path, monkeypatch):
+    """Git repository with a note committed yesterday, and the working directory restored after the test"""
+    path = tmp_path / "repo"
+    path.mkdir()
+    monkeypatch.chdir(tmp_path) # check_and_commit changes into the repository
+    _git(path, "init", "-q")
+    _git(path, "config", "user.email", "test@example.com")
+    _git(path, "config", "user.name", "Test")
+    (path / "old name.md").write_text("note")
+    (path / "untouched.md").write_text("note")
+    _git(path, "add", "-A")
+    _git(path, "commit", "-q", "-m", "Initial", env={"GIT_COMMITTER_DATE": "2000-01-01T00:00:00"})
+    return path
+
+def _git(path, *args, env=None):
+    return subprocess.run(["git", *args], cwd=path, check=True, stdout=subprocess.PIPE, env={**os.environ, **(env or {})}).stdout.decode()
+
+def _write_change_log(repo_path, tmp_path, monkeypatch, names):
+    """Records the given paths of the repository's vault and writes them to a change log the way a run does"""
+    changed_paths_file = tmp_path / "changed_paths.txt"
+    monkeypatch.setattr(ChangeLog, "get_log_path", staticmethod(lambda root_file: str(changed_paths_file)))
+    for name in names:
+        ChangeLog.record_path(str(repo_path / name))
+    ChangeLog.flush(File.from_abs_path(str(repo_path), -1))
+    return changed_paths_file
+
+def _committed_paths(path):
+    return [tuple(line.split("\t")) for line in _git(path, "show", "--name-status", "--no-renames", "--format=", "HEAD").splitlines()]
+
+def test_commits_only_the_changed_paths(repo_path, tmp_path, monkeypatch):
+    os.rename(repo_path / "old name.md", repo_path / "10.00 old name.md")
+    (repo_path / "untouched.md").write_text("edited by hand")
+    changed_paths_file = _write_change_log(repo_path, tmp_path, monkeypatch, ["old name.md", "10.00 old name.md"])
+    assert changed_paths_file.read_text() == "10.00 old name.md\nold name.md\n" # Relative to the vault
+
+    commit_daily.check_and_commit(str(repo_path), str(changed_paths_file))
+
+    assert _committed_paths(repo_path) == [("A", "10.00 old name.md"), ("D", "old name.md")]
+    assert not changed_paths_file.exists()
+    assert not os.path.exists(f"{changed_paths_file}.committing")
+
+def test_hands_the_paths_back_if_staging_fails(repo_path, tmp_path, monkeypatch):
+    changed_paths_file = _write_change_log(repo_path, tmp_path, monkeypatch, ["untouched.md"])
+    (repo_path / "untouched.md").write_text("edited")
+    run = subprocess.run
+    def run_without_git_add(args, **kwargs):
+        if "add" in args:
+            raise OSError(7, "Argument list too long")
+        return run(args, **kwargs)
+    monkeypatch.setattr(subprocess, "run", run_without_git_add)
+
+    commit_daily.check_and_commit(str(repo_path), str(changed_paths_file))
+
+    assert changed_paths_file.read_text() == "untouched.md\n"
+    assert not os.path.exists(f"{changed_paths_file}.committing")
+
+def test_merges_back_a_claim_left_by_an_interrupted_run(repo_path, tmp_path, monkeypatch):
+    (repo_path / "untouched.md").write_text("edited")
+    (repo_path / "new.md").write_text("note")
+    changed_paths_file = _write_change_log(repo_path, tmp_path, monkeypatch, ["untouched.md"])
+    os.rename(changed_paths_file, f"{changed_paths_file}.committing")
+    _write_change_log(repo_path, tmp_path, monkeypatch, ["new.md"])
+
+    commit_daily.check_and_commit(str(repo_path), str(changed_paths_file))
+
+    assert _committed_paths(repo_path) == [("A", "new.md"), ("M", "untouched.md")]
+    assert not os.path.exists(f"{changed_paths_file}.committing")
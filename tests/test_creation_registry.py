@@ -0,0 +1,67 @@
+import json
+import os
+import pytest
+from utils.file import File, CreationRegistry, RealFileSystem
+from utils.index.index_helper import IndexHelper as ih
+from fix_indexes import bfs_fix_indexes
+from create_jdex import create_jdex
+from tests.helpers import VAULT_PATH
+
+AREA_PATH = f"{VAULT_PATH}/10-19 Work"
+
+@pytest.fixture
+def file_system(memory_file_system):
+    """In-memory vault with two notes seen in the opposite order of their names"""
+    memory_file_system.add_file(f"{AREA_PATH}/10 Projects/b.md", creation_time=1)
+    memory_file_system.add_file(f"{AREA_PATH}/10 Projects/a.md", creation_time=2)
+    return memory_file_system
+
+def _registry(file_system, dir_path):
+    path = f"{dir_path}/.creation_order.json"
+    return json.loads(file_system.read_text(path)) if file_system.exists(path) else None
+
+def _child_names(dir_path, level):
+    return [child_file.name for child_file in File.from_abs_path(dir_path, level).get_children() if not child_file.name.startswith(".")]
+
+def test_first_seen_order_is_kept_across_hosts(file_system):
+    assert _child_names(f"{AREA_PATH}/10 Projects", 1) == ["b.md", "a.md"]
+    CreationRegistry.flush()
+    assert _registry(file_system, f"{AREA_PATH}/10 Projects") == {"a.md": 2, "b.md": 1}
+
+    # Another host sees different timestamps, but reads the synced registry
+    file_system.add_file(f"{AREA_PATH}/10 Projects/b.md", creation_time=3)
+    CreationRegistry.clear()
+    assert _child_names(f"{AREA_PATH}/10 Projects", 1) == ["b.md", "a.md"]
+
+def test_registry_disappears_once_everything_is_indexed(file_system):
+    _child_names(f"{AREA_PATH}/10 Projects", 1)
+    CreationRegistry.flush()
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file))
+    CreationRegistry.flush()
+    assert _child_names(f"{AREA_PATH}/10 Projects", 1) == ["10.00 b.md", "10.01 a.md"]
+    assert _registry(file_system, f"{AREA_PATH}/10 Projects") is None
+
+def test_registry_moves_with_its_directory(file_system):
+    file_system.add_file(f"{AREA_PATH}/10 Projects/10.00 Topic/x.md", creation_time=1)
+    _child_names(f"{AREA_PATH}/10 Projects/10.00 Topic", 2)
+    File.from_abs_path(f"{AREA_PATH}/10 Projects/10.00 Topic", 2).rename(File.from_abs_path(f"{AREA_PATH}/10 Projects/10.01 Topic", 2))
+    CreationRegistry.flush()
+    assert _registry(file_system, f"{AREA_PATH}/10 Projects/10.01 Topic") == {"x.md": 1}
+
+def test_walks_outside_the_areas_leave_no_registry(file_system):
+    file_system.add_file(f"{VAULT_PATH}/Inbox.md", creation_time=1)
+    file_system.add_file(f"{VAULT_PATH}/Attachments/image.png", creation_time=1)
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    create_jdex(root_file)
+    _child_names(f"{VAULT_PATH}/Attachments", 0)
+    CreationRegistry.flush()
+    assert _registry(file_system, VAULT_PATH) is None
+    assert _registry(file_system, f"{VAULT_PATH}/Attachments") is None
+
+def test_creation_time_falls_back_to_the_modified_time(tmp_path):
+    """Linux has no st_birthtime"""
+    path = tmp_path / "note.md"
+    path.write_text("note")
+    stat = os.stat(path)
+    assert RealFileSystem().get_creation_time(str(path)) == getattr(stat, "st_birthtime", stat.st_mtime)
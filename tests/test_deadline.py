@@ -0,0 +1,67 @@
+import os
+import pytest
+from utils.file import File
+from utils.index.index_helper import IndexHelper as ih
+from utils.run import Deadline, ResumeQueue
+from fix_indexes import bfs_fix_indexes
+from tests.helpers import VAULT_PATH
+
+class _DeadlineAfter:
+    """Passes once the given number of directories were started"""
+    def __init__(self, num_dirs):
+        self.num_dirs = num_dirs
+
+    def has_passed(self):
+        self.num_dirs -= 1
+        return self.num_dirs < 0
+
+@pytest.fixture
+def file_system(memory_file_system, tmp_path, monkeypatch):
+    """In-memory vault whose Life area was modified last, with the resume queue kept in a temporary directory"""
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md", creation_time=1)
+    memory_file_system.add_file(f"{VAULT_PATH}/20-29 Life/Health/run.md", creation_time=2)
+    memory_file_system.set_modified_time(f"{VAULT_PATH}/10-19 Work", 100)
+    memory_file_system.set_modified_time(f"{VAULT_PATH}/20-29 Life", 200)
+    monkeypatch.setattr(ResumeQueue, "get_path", staticmethod(lambda root_file: str(tmp_path / "resume.json")))
+    return memory_file_system
+
+def _fix(deadline):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    return [os.path.basename(new_path) for _, new_path in bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file), deadline=deadline)]
+
+def test_resumes_where_the_deadline_stopped(file_system):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    assert _fix(_DeadlineAfter(1)) == ["20 Health"] # The most recently modified area goes first
+    remaining_dirs = ResumeQueue.pop_all(root_file)
+    assert [dir_file.name for dir_file in remaining_dirs] == ["10-19 Work", "20 Health"]
+
+    ResumeQueue.save(root_file, remaining_dirs)
+    assert _fix(_DeadlineAfter(100)) == ["10 Meetings", "20.00 run.md", "10.00 agenda.md"] # Left over directories go first
+    assert ResumeQueue.pop_all(root_file) == []
+
+def test_resumed_directories_wait_for_their_ancestors(file_system):
+    """A left over directory isn't fixed under the name its category loses later in the run"""
+    file_system.add_file(f"{VAULT_PATH}/30-39 Home/30 Alpha/a.md", creation_time=1)
+    file_system.add_file(f"{VAULT_PATH}/30-39 Home/30 Keep/30.00 Topic/31.00-0 x.md", creation_time=2)
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    ResumeQueue.save(root_file, [File.from_abs_path(f"{VAULT_PATH}/30-39 Home/30 Keep/30.00 Topic", 2)])
+
+    assert "30.00-0 x.md" not in _fix(_DeadlineAfter(100))
+    assert file_system.exists(f"{VAULT_PATH}/30-39 Home/31 Keep/31.00 Topic/31.00-0 x.md")
+
+def test_fixing_one_directory_keeps_the_left_over_directories(file_system):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    ResumeQueue.save(root_file, [File.from_abs_path(f"{VAULT_PATH}/10-19 Work", 0)])
+    bfs_fix_indexes(root_file, [File.from_abs_path(f"{VAULT_PATH}/20-29 Life", 0)])
+    assert [dir_file.name for dir_file in ResumeQueue.pop_all(root_file)] == ["10-19 Work"]
+
+    ResumeQueue.save(root_file, [File.from_abs_path(f"{VAULT_PATH}/10-19 Work", 0)])
+    _fix(None)
+    assert ResumeQueue.pop_all(root_file) == []
+
+def test_parses_durations():
+    assert Deadline.parse("90").seconds == 90
+    assert Deadline.parse("25m").seconds == 1500
+    assert Deadline.parse("1.5h").seconds == 5400
+    with pytest.raises(ValueError):
+        Deadline.parse("soon")
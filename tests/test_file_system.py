@@ -0,0 +1,231 @@
+import pytest
+from utils.file import File, CountingFileSystem, RealFileSystem, TreeFingerprint, TreeSnapshot
+from utils.obsidian import ObsidianFixer as of
+from utils.index.index_helper import IndexHelper as ih
+from utils.index.jd_index import JDIndex
+from utils.run import RunMetrics
+from fix_indexes import bfs_fix_indexes, fix_weblinks
+import create_jdex as create_jdex_module
+from create_jdex import create_jdex
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system):
+    """In-memory backend wrapped in a counter"""
+    file_system = CountingFileSystem(memory_file_system)
+    File.use_file_system(file_system)
+    return file_system
+
+def _add_messy_vault(file_system):
+    fs = file_system.file_system
+    fs.add_dir(f"{VAULT_PATH}/10-19 Work/11 Projects/A topic")
+    fs.add_dir(f"{VAULT_PATH}/10-19 Work/Meetings")
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/A topic/note one.md", "see [[Meetings|m]]", creation_time=1)
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/A topic/second.md", "x", creation_time=2)
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md", "[[note one]] [[second#h]]", creation_time=3)
+
+def _add_clean_vault(file_system, num_categories, num_topics, num_notes):
+    fs = file_system.file_system
+    for category in range(num_categories):
+        for topic in range(num_topics):
+            topic_path = f"{VAULT_PATH}/10-19 Area/1{category} Category/1{category}.{topic:02} Topic"
+            fs.add_dir(topic_path)
+            for note in range(num_notes):
+                fs.add_file(f"{topic_path}/1{category}.{topic:02}-{note:0{len(str(num_notes - 1))}} Note.md")
+    return 1 + 1 + num_categories + num_categories * num_topics # Vault, area, categories, topics
+
+def _run(root_path):
+    root_file = File.from_abs_path(root_path, -1)
+    renames = bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file))
+    fix_weblinks(root_file, renames)
+    create_jdex(root_file)
+    return list(renames)
+
+def test_fixes_vault_in_memory(file_system):
+    """Renames and link rewrites happen in memory only"""
+    _add_messy_vault(file_system)
+    _run(VAULT_PATH)
+
+    fs = file_system.file_system
+    topic_path = f"{VAULT_PATH}/10-19 Work/10 Projects/10.00 A topic"
+    assert sorted(name for name, _ in fs.list_dir(topic_path)) == ["10.00-0 note one.md", "10.00-1 second.md"]
+    assert fs.read_text(f"{topic_path}/10.00-0 note one.md") == "see [[11 Meetings|m]]"
+    assert fs.read_text(f"{VAULT_PATH}/10-19 Work/11 Meetings/11.00 agenda.md") == "[[10.00-0 note one]] [[10.00-1 second#h]]"
+    assert fs.is_file(f"{VAULT_PATH}/10-19 Work/Index of 10-19 Work.md")
+
+def test_clean_vault_lists_every_directory_once(file_system):
+    """An already indexed vault costs exactly one list_dir per directory and no renames"""
+    num_dirs = _add_clean_vault(file_system, num_categories=5, num_topics=10, num_notes=10)
+    renames = _run(VAULT_PATH)
+
+    assert renames == []
+    assert file_system.counts["list_dir"] == num_dirs
+    assert file_system.counts["rename"] == 0
+
+def test_deep_tree_does_not_recurse(file_system):
+    """Walks deeper than the recursion limit work, as no traversal recurses per directory level"""
+    fs = file_system.file_system
+    dir_path = f"{VAULT_PATH}/10-19 Work/10 Projects/10.00 A topic" + "/Archive" * 2000
+    fs.add_file(f"{dir_path}/deep.md", "[[old]]")
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/old.md")
+
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    of.update_weblinks(root_file, File.from_abs_path(f"{VAULT_PATH}/10-19 Work/old.md"), File.from_abs_path(f"{VAULT_PATH}/10-19 Work/11 old.md"))
+    create_jdex(root_file)
+
+    assert fs.read_text(f"{dir_path}/deep.md") == "[[11 old]]"
+    assert "[[deep.md]]" in fs.read_text(f"{VAULT_PATH}/10-19 Work/Index of 10-19 Work.md")
+
+def test_caches_stay_within_the_memory_budget(file_system, config_overrides):
+    """Classifications and parsed indexes are dropped beyond max_entries_in_memory instead of growing with the vault"""
+    config_overrides["max_entries_in_memory"] = 100
+    caches = [ih._index_type_cache, JDIndex._parsed]
+    for cache in caches:
+        cache.clear() # Picks up the budget again
+    try:
+        _add_clean_vault(file_system, num_categories=2, num_topics=10, num_notes=20)
+        assert _run(VAULT_PATH) == []
+        assert all(len(cache) <= 100 for cache in caches)
+    finally:
+        for cache in caches:
+            cache.clear()
+
+def test_shards_jdex_by_category(file_system, config_overrides):
+    """Every category gets a JDex of its own, which the area's JDex links to instead of listing its contents"""
+    config_overrides.update(jdex_shard_by_category=True, jdex_max_depth=2)
+    _add_clean_vault(file_system, num_categories=2, num_topics=2, num_notes=2)
+    create_jdex(File.from_abs_path(VAULT_PATH, -1))
+
+    fs = file_system.file_system
+    area_jdex = fs.read_text(f"{VAULT_PATH}/10-19 Area/Index of 10-19 Area.md")
+    assert "**10 Category** [[Index of 10 Category|JDex]]" in area_jdex
+    assert "10.00 Topic" not in area_jdex
+    category_jdex = fs.read_text(f"{VAULT_PATH}/10-19 Area/10 Category/Index of 10 Category.md")
+    assert "**10.00 Topic**" in category_jdex
+    assert "[[10.00-0 Note.md]]" in category_jdex
+    assert "11.00 Topic" not in category_jdex
+
+    config_overrides["jdex_max_depth"] = 1
+    create_jdex(File.from_abs_path(VAULT_PATH, -1))
+    assert "Note.md" not in fs.read_text(f"{VAULT_PATH}/10-19 Area/10 Category/Index of 10 Category.md")
+
+    config_overrides.update(jdex_shard_by_category=False, jdex_max_depth=None)
+    create_jdex(File.from_abs_path(VAULT_PATH, -1))
+    assert not fs.exists(f"{VAULT_PATH}/10-19 Area/10 Category/Index of 10 Category.md")
+    assert "[[10.00-0 Note.md]]" in fs.read_text(f"{VAULT_PATH}/10-19 Area/Index of 10-19 Area.md")
+
+def test_counts_not_indexed_files_without_walking_kept_jdex_files(file_system, config_overrides, tmp_path, monkeypatch):
+    """With sharding, the NOT INDEXED counts of unchanged categories are read back from their JDex instead of walking them"""
+    config_overrides["jdex_shard_by_category"] = True
+    monkeypatch.setattr(TreeFingerprint, "get_path", staticmethod(lambda root_file, stage: str(tmp_path / "fingerprints.json")))
+    _add_clean_vault(file_system, num_categories=2, num_topics=2, num_notes=2)
+    fs = file_system.file_system
+    fs.add_file(f"{VAULT_PATH}/10-19 Area/10 Category/10.00 Topic/loose.md")
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+
+    def run_jdex_stage():
+        RunMetrics.start()
+        fingerprints = TreeFingerprint(root_file, "jdex")
+        fingerprints.update()
+        create_jdex(root_file, fingerprints=fingerprints)
+        fingerprints.save()
+        return dict(RunMetrics._not_indexed_counts)
+
+    assert run_jdex_stage() == {"10-19 Area": 1}
+    fs.add_file(f"{VAULT_PATH}/10-19 Area/11 Category/11.00 Topic/new.md")
+    TreeSnapshot.invalidate(f"{VAULT_PATH}/10-19 Area/11 Category/11.00 Topic/new.md")
+    checked_paths = []
+    is_not_indexed = create_jdex_module._is_not_indexed
+    monkeypatch.setattr(create_jdex_module, "_is_not_indexed", lambda file: checked_paths.append(file.get_abs_path()) or is_not_indexed(file))
+    assert run_jdex_stage() == {"10-19 Area": 2}
+    assert checked_paths and not any(path.startswith(f"{VAULT_PATH}/10-19 Area/10 Category/") for path in checked_paths)
+
+def test_counts_not_indexed_files_below_the_max_depth(file_system, config_overrides, tmp_path, monkeypatch):
+    """Directories the JDex stops at carry the NOT INDEXED count below them, also once their JDex is kept"""
+    config_overrides["jdex_max_depth"] = 1
+    monkeypatch.setattr(TreeFingerprint, "get_path", staticmethod(lambda root_file, stage: str(tmp_path / "fingerprints.json")))
+    _add_clean_vault(file_system, num_categories=1, num_topics=1, num_notes=1)
+    fs = file_system.file_system
+    fs.add_file(f"{VAULT_PATH}/10-19 Area/10 Category/10.00 Topic/loose.md")
+    fs.add_file(f"{VAULT_PATH}/10-19 Area/10 Category/10.00 Topic/other.md")
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+
+    for _ in range(2): # Generated, then kept
+        RunMetrics.start()
+        fingerprints = TreeFingerprint(root_file, "jdex")
+        fingerprints.update()
+        create_jdex(root_file, fingerprints=fingerprints)
+        fingerprints.save()
+        assert dict(RunMetrics._not_indexed_counts) == {"10-19 Area": 2}
+    assert RunMetrics._counts["jdex_files_skipped"] == 2
+    assert "**10 Category** **(2 NOT INDEXED below)**" in fs.read_text(f"{VAULT_PATH}/10-19 Area/Index of 10-19 Area.md")
+
+def test_links_pipeline_raises_write_errors(file_system, monkeypatch):
+    """A failing write stops the reading and rewriting threads instead of leaving them blocked"""
+    fs = file_system.file_system
+    for note in range(200):
+        fs.add_file(f"{VAULT_PATH}/10-19 Work/10 Projects/note {note}.md", "[[old]]")
+
+    def write_text(path, content):
+        raise OSError("disk full")
+    monkeypatch.setattr(fs, "write_text", write_text)
+
+    with pytest.raises(OSError, match="disk full"):
+        of.update_weblinks(File.from_abs_path(VAULT_PATH, -1), File.from_abs_path(f"{VAULT_PATH}/old.md"), File.from_abs_path(f"{VAULT_PATH}/new.md"))
+
+def test_chained_renames_are_followed_to_the_final_name(file_system):
+    """Pending renames of an earlier run are followed by the renames of this one, like applying them one by one"""
+    fs = file_system.file_system
+    fs.add_file(f"{VAULT_PATH}/10-19 Work/note.md", "[[12.03 C]] [[12.02 C|c]] [[A]] [[B]]")
+    renames = [(f"{VAULT_PATH}/{old_name}.md", f"{VAULT_PATH}/{new_name}.md")
+               for old_name, new_name in [("12.03 C", "12.02 C"), ("12.02 C", "12.01 C"), ("A", "B"), ("B", "A")]]
+    of.update_weblinks_for_renames(File.from_abs_path(VAULT_PATH, -1), renames)
+    assert fs.read_text(f"{VAULT_PATH}/10-19 Work/note.md") == "[[12.01 C]] [[12.01 C|c]] [[A]] [[A]]"
+
+def test_links_back_up_the_tree_are_visited_once(file_system):
+    """A directory linked from below itself is traversed once, and a file with two paths is rewritten once"""
+    _add_clean_vault(file_system, num_categories=1, num_topics=1, num_notes=1)
+    fs = file_system.file_system
+    topic_path = f"{VAULT_PATH}/10-19 Area/10 Category/10.00 Topic"
+    fs.add_link(f"{topic_path}/10.00-1 Loop", f"{VAULT_PATH}/10-19 Area")
+    fs.write_text(f"{topic_path}/10.00-0 Note.md", "[[x]]")
+    fs.add_link(f"{topic_path}/10.00-2 Same note.md", f"{topic_path}/10.00-0 Note.md")
+
+    _run(VAULT_PATH)
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    renames = [(f"{VAULT_PATH}/{old_name}.md", f"{VAULT_PATH}/{new_name}.md") for old_name, new_name in [("x", "y"), ("y", "z")]]
+    of.update_weblinks_for_renames(root_file, renames)
+
+    assert fs.read_text(f"{topic_path}/10.00-0 Note.md") == "[[z]]" # The chain x => y => z is followed
+    assert fs.read_text(f"{VAULT_PATH}/10-19 Area/Index of 10-19 Area.md").count("10.00 Topic") == 1 # The loop isn't descended into
+
+def test_symlinks_are_only_followed_if_configured(config_overrides, tmp_path):
+    topic_path = tmp_path / "vault" / "10-19 Area" / "10 Category" / "10.00 Topic"
+    topic_path.mkdir(parents=True)
+    (topic_path / "10.00-0 Note.md").write_text("[[x]]")
+    (topic_path / "10.00-1 Loop").symlink_to(tmp_path / "vault" / "10-19 Area")
+
+    for follow_symlinks in [False, True]:
+        config_overrides["follow_symlinks"] = follow_symlinks
+        File.use_file_system(RealFileSystem())
+        root_file = File.from_abs_path(str(tmp_path / "vault"), -1)
+        create_jdex(root_file)
+        assert ("10.00-1 Loop" in (tmp_path / "vault" / "10-19 Area" / "Index of 10-19 Area.md").read_text()) == follow_symlinks
+        assert _fixes_nothing(root_file)
+    File.use_file_system(RealFileSystem())
+
+def test_dangling_symlinks_are_skipped(config_overrides, tmp_path):
+    """A symlink to nothing is neither a file nor a directory, so no stage stats it"""
+    config_overrides["follow_symlinks"] = True
+    category_path = tmp_path / "vault" / "10-19 Area" / "10 Category"
+    category_path.mkdir(parents=True)
+    (category_path / "agenda.md").write_text("[[gone]]")
+    (category_path / "gone.md").symlink_to(tmp_path / "missing.md")
+
+    File.use_file_system(RealFileSystem())
+    _run(str(tmp_path / "vault"))
+    assert sorted(path.name for path in category_path.iterdir()) == ["10.00 agenda.md", "gone.md"]
+    assert "gone.md" not in (tmp_path / "vault" / "10-19 Area" / "Index of 10-19 Area.md").read_text()
+
+def _fixes_nothing(root_file):
+    return len(bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file))) == 0
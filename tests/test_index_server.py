@@ -0,0 +1,107 @@
+import json
+import time
+import socket
+import threading
+import pytest
+from utils.file import FileSystem
+from utils.run import ChangeLog, RenameJournal, RunLock
+from utils.server import IndexServer
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def server(memory_file_system):
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/10 Projects/10.00 Topic/10.00-0 First.md")
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/10 Projects/10.00 Topic/10.00-1 Second.md")
+    memory_file_system.add_dir(f"{VAULT_PATH}/10-19 Work/11 Meetings")
+    return IndexServer(VAULT_PATH, socket_path="/unused.sock")
+
+def _call(server, method, params):
+    return server.handle_request(json.dumps({"jsonrpc": "2.0", "method": method, "params": params, "id": 1}))
+
+@pytest.mark.parametrize("dir_path,name,expected", [
+    ("10-19 Work/10 Projects/10.00 Topic", "Third.md", "10.00-2 Third.md"),
+    ("10-19 Work/10 Projects", "New topic", "10.01 New topic"),
+    ("10-19 Work", "New category", "12 New category"),
+])
+def test_propose_id(server, dir_path, name, expected):
+    assert _call(server, "propose_id", [dir_path, name])["result"] == expected
+
+def test_resolve_id(server):
+    assert _call(server, "resolve_id", ["10.00-1"])["result"] == "10-19 Work/10 Projects/10.00 Topic/10.00-1 Second.md"
+    assert _call(server, "resolve_id", {"index": "11"})["result"] == "10-19 Work/11 Meetings"
+    assert _call(server, "resolve_id", ["99.99"])["result"] is None
+
+@pytest.mark.parametrize("method,params,code", [
+    ("unknown", [], -32601),
+    ("resolve_id", [], -32602),
+    ("propose_id", ["../outside", "Note.md"], -32000),
+])
+def test_errors(server, method, params, code):
+    assert _call(server, method, params)["error"]["code"] == code
+
+def test_rejects_requests_that_are_not_objects(server):
+    assert server.handle_request("[]")["error"]["code"] == -32600
+    assert server.handle_request('[{"jsonrpc": "2.0", "method": "resolve_id", "params": ["11"], "id": 1}]')["error"]["code"] == -32600
+
+def test_unknown_ids_dont_rewalk_the_vault(server, monkeypatch):
+    walks = []
+    collect_ids = server._collect_ids
+    monkeypatch.setattr(server, "_collect_ids", lambda: walks.append(1) or collect_ids())
+    for _ in range(3):
+        assert _call(server, "resolve_id", ["99.99"])["result"] is None
+    assert len(walks) == 1
+    _call(server, "invalidate", [])
+    assert _call(server, "resolve_id", ["99.99"])["result"] is None
+    assert len(walks) == 2
+
+def test_reindex_never_prompts(server, memory_file_system, config_overrides, tmp_path, monkeypatch):
+    config_overrides.update(prompt_for_approval=True, approval_mode="file")
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("The server prompted"))
+    for state in (RunLock, RenameJournal):
+        monkeypatch.setattr(state, "get_path", staticmethod(lambda root_file, name=state.__name__: str(tmp_path / name)))
+    monkeypatch.setattr(ChangeLog, "get_log_path", staticmethod(lambda root_file: str(tmp_path / "changed_paths.txt")))
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/11 Meetings/agenda.md")
+
+    assert _call(server, "reindex", ["10-19 Work/11 Meetings"])["result"] == [
+        {"old": "10-19 Work/11 Meetings/agenda.md", "new": "10-19 Work/11 Meetings/11.00 agenda.md"}]
+
+def test_resolve_id_notices_renames_by_other_processes(server):
+    assert _call(server, "resolve_id", ["10.00-1"])["result"] == "10-19 Work/10 Projects/10.00 Topic/10.00-1 Second.md"
+    topic_path = f"{VAULT_PATH}/10-19 Work/10 Projects/10.00 Topic"
+    FileSystem.get_active().rename(f"{topic_path}/10.00-1 Second.md", f"{topic_path}/10.00-2 Second.md")
+    assert _call(server, "resolve_id", ["10.00-1"])["result"] is None
+    assert _call(server, "resolve_id", ["10.00-2"])["result"] == "10-19 Work/10 Projects/10.00 Topic/10.00-2 Second.md"
+
+def test_refuses_the_socket_of_a_live_server(server, tmp_path):
+    socket_path = str(tmp_path / "vault.sock")
+    live_server = IndexServer(VAULT_PATH, socket_path=socket_path)
+    thread = threading.Thread(target=live_server.serve_forever, daemon=True)
+    thread.start()
+    while live_server._server is None:
+        time.sleep(0.01)
+
+    errors = []
+    def serve_again():
+        try:
+            IndexServer(VAULT_PATH, socket_path=socket_path).serve_forever()
+        except RuntimeError as e:
+            errors.append(e)
+    second_thread = threading.Thread(target=serve_again, daemon=True) # Hangs serving if it took the socket
+    second_thread.start()
+    second_thread.join(timeout=5)
+    assert "already listening" in str(errors)
+    live_server.shutdown()
+    thread.join()
+
+def test_replaces_a_stale_socket(server, tmp_path):
+    socket_path = str(tmp_path / "vault.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as dead_server:
+        dead_server.bind(socket_path) # Never listens, like a server that died
+
+    replacing_server = IndexServer(VAULT_PATH, socket_path=socket_path)
+    thread = threading.Thread(target=replacing_server.serve_forever, daemon=True)
+    thread.start()
+    while replacing_server._server is None:
+        time.sleep(0.01)
+    replacing_server.shutdown()
+    thread.join()
@@ -0,0 +1,32 @@
+import pytest
+from utils.index.jd_index import JDIndex
+
+@pytest.mark.parametrize("text, level, parent", [
+    ("10-19", 0, None),
+    ("12", 1, "10-19"),
+    ("12.34", 2, "12"),
+    ("12.34+A", 3, "12.34"),
+    ("12.34-2", 3, "12.34"),
+    ("12.34+AB-02", 4, "12.34+AB"),
+])
+def test_derives_level_and_parent(text, level, parent):
+    jd_index = JDIndex.parse(text)
+    assert str(jd_index) == text
+    assert jd_index.level == level
+    assert (None if jd_index.parent() is None else str(jd_index.parent())) == parent
+
+@pytest.mark.parametrize("text", ["10-29", "1", "123", "12.3", "12.34.5", "12.34+a", "12-3", "Notes"])
+def test_rejects_indexes_without_ancestry(text):
+    assert JDIndex.parse(text) is None
+
+def test_orders_and_hashes_by_value():
+    texts = ["20-29", "12.34+B", "12.34-10", "12.34+AA", "12", "12.34-2", "10-19", "12.34+B-1", "12.35"]
+    ordered = sorted(JDIndex.parse(text) for text in texts)
+    assert [str(jd_index) for jd_index in ordered] == ["10-19", "12", "12.34-2", "12.34-10", "12.34+B", "12.34+B-1", "12.34+AA", "12.35", "20-29"]
+    assert JDIndex.parse("12.34-02") == JDIndex.parse("12.34-2")
+    assert len({JDIndex.parse("12.34-02"), JDIndex.parse("12.34-2")}) == 1
+    assert [str(jd_index) for jd_index in JDIndex.parse("12.34+A-2").ancestors()] == ["10-19", "12", "12.34", "12.34+A", "12.34+A-2"]
+
+def test_is_immutable():
+    with pytest.raises(AttributeError):
+        JDIndex.parse("12.34").topic = 35
@@ -0,0 +1,39 @@
+import os
+import shutil
+import pytest
+from utils.file import File
+from utils.pipeline import Pipeline
+from utils.run import PendingLinks
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system, tmp_path, monkeypatch):
+    """In-memory vault with a link to a note the fix renames, and the run state kept in a temporary logs/"""
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/10 Meetings/agenda.md", "[[notes]]", creation_time=1)
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/10 Meetings/notes.md", creation_time=2)
+    (tmp_path / "logs").mkdir()
+    shutil.copy(f"{File.get_root_path()}/config.yaml", tmp_path)
+    monkeypatch.setattr(File, "get_root_path", staticmethod(lambda: str(tmp_path)))
+    return memory_file_system
+
+def test_rejects_unknown_stages(file_system):
+    with pytest.raises(ValueError, match="Unknown stages"):
+        Pipeline(VAULT_PATH).run(["fix", "lint"])
+
+def test_runs_stages_in_pipeline_order(file_system, monkeypatch):
+    stages = []
+    monkeypatch.setattr(Pipeline, "_run_stage", lambda self, stage: stages.append(stage))
+    assert Pipeline(VAULT_PATH).run(["commit", "jdex", "fix", "links"]) == "completed"
+    assert stages[0] == "fix"
+    assert sorted(stages[1:3]) == ["jdex", "links"] # Run at the same time
+    assert stages[3] == "commit"
+
+def test_links_run_picks_up_the_renames_of_a_fix_only_run(file_system):
+    agenda_path = f"{VAULT_PATH}/10-19 Work/10 Meetings/10.00 agenda.md"
+    assert Pipeline(VAULT_PATH).run(["fix"]) == "completed"
+    assert file_system.read_text(agenda_path) == "[[notes]]"
+    assert os.path.exists(PendingLinks.get_path(File.from_abs_path(VAULT_PATH, -1)))
+
+    assert Pipeline(VAULT_PATH).run(["links"]) == "completed"
+    assert file_system.read_text(agenda_path) == "[[10.01 notes]]"
+    assert not os.path.exists(PendingLinks.get_path(File.from_abs_path(VAULT_PATH, -1)))
@@ -0,0 +1,82 @@
+import os
+import json
+import pytest
+from utils.file import File, TreeFingerprint
+from utils.run import ChangeLog, PendingLinks, RenameJournal, ResumeQueue, RunLock
+from fix_indexes import fix_vault_once, undo_last_run
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system, tmp_path, monkeypatch):
+    """In-memory vault with the journal and pending links kept in a temporary directory"""
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md")
+    monkeypatch.setattr(RenameJournal, "get_path", staticmethod(lambda root_file: str(tmp_path / "journal.jsonl")))
+    monkeypatch.setattr(PendingLinks, "get_path", staticmethod(lambda root_file: str(tmp_path / "pending_links.jsonl")))
+    return memory_file_system
+
+def _rename(old_path, new_path):
+    return (File.from_abs_path(f"{VAULT_PATH}/{old_path}"), File.from_abs_path(f"{VAULT_PATH}/{new_path}"))
+
+def test_rolls_interrupted_run_forward(file_system):
+    """Journaled renames that weren't applied are applied, and their wikilinks are left for the links stage"""
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    renames = [_rename("10-19 Work/Meetings", "10-19 Work/10 Meetings"), _rename("10-19 Work/10 Meetings/agenda.md", "10-19 Work/10 Meetings/10.00 agenda.md")]
+    RenameJournal.begin(root_file)
+    RenameJournal.log_renames(renames)
+    renames[0][0].rename(renames[0][1]) # Killed after the first rename of the batch
+    RenameJournal._journal_file.write('{"op": "ren') # and in the middle of writing the next batch
+    RenameJournal._journal_file.close()
+    RenameJournal._journal_file = None
+
+    assert RenameJournal.recover(root_file) == 1
+    assert file_system.is_file(f"{VAULT_PATH}/10-19 Work/10 Meetings/10.00 agenda.md")
+    assert [(os.path.basename(old_path), os.path.basename(new_path)) for old_path, new_path in PendingLinks.pop_all(root_file)] == [("Meetings", "10 Meetings"), ("agenda.md", "10.00 agenda.md")]
+    assert RenameJournal.recover(root_file) == 0
+
+def test_keeps_last_run_with_renames(file_system):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    RenameJournal.begin(root_file)
+    RenameJournal.log_renames([_rename("10-19 Work/Meetings", "10-19 Work/10 Meetings")])
+    RenameJournal.mark_links_done()
+    RenameJournal.end()
+    for _ in range(3):
+        RenameJournal.begin(root_file) # Runs without renames
+        RenameJournal.end()
+
+    _, undo_of, renames = RenameJournal.get_last_run(root_file)
+    assert undo_of is None
+    assert renames == [(f"{VAULT_PATH}/10-19 Work/Meetings", f"{VAULT_PATH}/10-19 Work/10 Meetings")]
+    with open(RenameJournal.get_path(root_file), "r", encoding="utf-8") as f:
+        assert [json.loads(line)["op"] for line in f] == ["begin", "rename", "links_done", "end", "begin", "end"]
+
+@pytest.fixture
+def run_state(tmp_path, monkeypatch):
+    """Keeps the rest of the state of a run in the temporary directory too"""
+    monkeypatch.setattr(TreeFingerprint, "get_path", staticmethod(lambda root_file, stage: str(tmp_path / f"fingerprints_{stage}.json")))
+    monkeypatch.setattr(ChangeLog, "get_log_path", staticmethod(lambda root_file: str(tmp_path / "changed_paths.txt")))
+    monkeypatch.setattr(ResumeQueue, "get_path", staticmethod(lambda root_file: str(tmp_path / "resume.json")))
+    monkeypatch.setattr(RunLock, "get_path", staticmethod(lambda root_file: str(tmp_path / "vault.lock")))
+
+def test_undo_keeps_the_jdex_fingerprints_truthful(file_system, run_state):
+    """A JDex written by the undo isn't vouched for by fingerprints of the tree before it, which the next fix restores"""
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    jdex_path = f"{VAULT_PATH}/10-19 Work/Index of 10-19 Work.md"
+
+    fix_vault_once(root_file)
+    assert undo_last_run(VAULT_PATH)
+    assert "**Meetings** **(NOT INDEXED)**" in file_system.read_text(jdex_path)
+
+    fix_vault_once(root_file)
+    assert "**10 Meetings**" in file_system.read_text(jdex_path)
+
+def test_undo_reverses_renames_that_free_each_others_names(file_system, run_state):
+    """A rename is only undoable once the rename undone before it has freed its old name"""
+    topic_path = f"{VAULT_PATH}/10-19 Work/10 Team/10.00 Weekly"
+    file_system.add_file(f"{topic_path}/10.00-1 Meeting.md", "[[10.00-2 Meeting]]")
+    file_system.add_file(f"{topic_path}/10.00-2 Meeting.md")
+
+    fix_vault_once(File.from_abs_path(VAULT_PATH, -1))
+    assert sorted(name for name, _ in file_system.list_dir(topic_path)) == ["10.00-0 Meeting.md", "10.00-1 Meeting.md"]
+    assert undo_last_run(VAULT_PATH)
+    assert sorted(name for name, _ in file_system.list_dir(topic_path)) == ["10.00-1 Meeting.md", "10.00-2 Meeting.md"]
+    assert file_system.read_text(f"{topic_path}/10.00-1 Meeting.md") == "[[10.00-2 Meeting]]"
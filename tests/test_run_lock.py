@@ -0,0 +1,48 @@
+import sys
+import pytest
+from utils.file import File
+from utils.run import RunLock
+from related_scripts import commit_daily
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def root_file(tmp_path, monkeypatch):
+    """Keeps the lock and rerun requests in a temporary directory"""
+    monkeypatch.setattr(RunLock, "get_path", staticmethod(lambda root_file: str(tmp_path / "vault.lock")))
+    return File.from_abs_path(VAULT_PATH, -1)
+
+def _run_overlapping(root_file, num_passes, overlapping_runs):
+    '''Runs a pass during which the given overlapping runs (request_rerun flags) start. Returns the number of passes'''
+    passes = []
+    def run_pass():
+        passes.append(len(passes))
+        if len(passes) <= num_passes:
+            for request_rerun in overlapping_runs:
+                assert not RunLock.run_coalesced(root_file, lambda: pytest.fail("Overlapping runs never run"), request_rerun)
+    assert RunLock.run_coalesced(root_file, run_pass)
+    return len(passes)
+
+def test_overlapping_runs_coalesce_into_one_extra_pass(root_file):
+    assert _run_overlapping(root_file, num_passes=1, overlapping_runs=[True, True, True]) == 2
+
+def test_commit_only_runs_dont_request_a_rerun(root_file):
+    assert _run_overlapping(root_file, num_passes=1, overlapping_runs=[False]) == 1
+
+def test_requests_during_the_extra_pass_are_left_for_the_next_run(root_file):
+    assert _run_overlapping(root_file, num_passes=2, overlapping_runs=[True]) == 2
+    assert _run_overlapping(root_file, num_passes=0, overlapping_runs=[]) == 1 # Covered by its first pass
+
+def test_commit_daily_skips_while_the_lock_is_held(root_file, monkeypatch, capsys):
+    commits = []
+    monkeypatch.setattr(commit_daily, "check_and_commit", lambda *args: commits.append(args))
+    monkeypatch.setattr(sys, "argv", ["commit_daily.py", "/repo", "--lock-file", RunLock.get_path(root_file)])
+
+    lock = RunLock(root_file)
+    assert lock.acquire()
+    commit_daily.main()
+    assert commits == []
+    assert "Skipping this run" in capsys.readouterr().out
+
+    lock.release()
+    commit_daily.main()
+    assert len(commits) == 1
@@ -0,0 +1,81 @@
+import json
+import pytest
+from utils.file import File
+from utils.index.index_helper import IndexHelper as ih
+from utils.run import RunLock, RunLog, RunMetrics
+from fix_indexes import bfs_fix_indexes, fix_weblinks, fix_vault
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def log_path(memory_file_system, tmp_path, monkeypatch):
+    """Writes the run log to a temporary file and runs against an in-memory vault"""
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md", "[[notes]]", creation_time=1)
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/notes.md", creation_time=2)
+    path = tmp_path / "run_vault.jsonl"
+    monkeypatch.setattr(RunLog, "get_path", staticmethod(lambda root_file: str(path)))
+    return path
+
+def _run(root_file):
+    RunMetrics.start()
+    RunLog.start(root_file)
+    fix_weblinks(root_file, bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file)))
+    RunLog.finish("completed")
+
+def _read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_ends_with_a_summary(log_path, config_overrides):
+    config_overrides["run_log_level"] = "info"
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    _run(root_file)
+
+    records = _read_records(log_path)
+    assert [record["event"] for record in records] == ["run_started", "summary"] # Per file events are debug
+    summary = records[-1]
+    assert summary["status"] == "completed"
+    assert summary["counts"]["renames_applied"] == 3
+    assert summary["counts"]["markdown_files_rewritten"] == 1
+    assert [new_path for _, new_path in summary["renames"]] == [f"{VAULT_PATH}/10-19 Work/10 Meetings",
+        f"{VAULT_PATH}/10-19 Work/10 Meetings/10.00 agenda.md", f"{VAULT_PATH}/10-19 Work/10 Meetings/10.01 notes.md"]
+
+def test_summary_streams_spilled_renames(log_path, config_overrides):
+    """Renames the fix spilled to disk are read back into the summary"""
+    config_overrides.update(run_log_level="info", max_entries_in_memory=1)
+    _run(File.from_abs_path(VAULT_PATH, -1))
+    assert [new_path for _, new_path in _read_records(log_path)[-1]["renames"]] == [f"{VAULT_PATH}/10-19 Work/10 Meetings",
+        f"{VAULT_PATH}/10-19 Work/10 Meetings/10.00 agenda.md", f"{VAULT_PATH}/10-19 Work/10 Meetings/10.01 notes.md"]
+
+def test_logs_every_action_at_debug(log_path, config_overrides):
+    config_overrides["run_log_level"] = "debug"
+    _run(File.from_abs_path(VAULT_PATH, -1))
+    rewrites = [record for record in _read_records(log_path) if record["event"] == "markdown_rewritten"]
+    assert [record["path"] for record in rewrites] == [f"{VAULT_PATH}/10-19 Work/10 Meetings/10.00 agenda.md"]
+
+def test_rotates_by_size(log_path, config_overrides):
+    config_overrides.update(run_log_max_bytes=1, run_log_backups=1)
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    for _ in range(3):
+        RunMetrics.start()
+        RunLog.start(root_file)
+        RunLog.finish("skipped")
+
+    assert [record["event"] for record in _read_records(log_path)] == ["run_started", "summary"]
+    assert len(_read_records(log_path.with_name("run_vault.jsonl.1"))) == 2 # The oldest run was dropped
+    assert not log_path.with_name("run_vault.jsonl.2").exists()
+
+def test_skipped_runs_leave_the_log_to_the_lock_holder(log_path, config_overrides, tmp_path, monkeypatch):
+    """A run that finds the vault locked appends its record without rotating the log the lock holder is writing"""
+    config_overrides.update(run_log_max_bytes=1, run_log_backups=1)
+    monkeypatch.setattr(RunLock, "get_path", staticmethod(lambda root_file: str(tmp_path / "vault.lock")))
+    log_path.write_text(json.dumps({"event": "run_started"}) + "\n")
+    lock = RunLock(File.from_abs_path(VAULT_PATH, -1))
+    assert lock.acquire()
+    try:
+        assert fix_vault(VAULT_PATH) == "skipped"
+    finally:
+        lock.release()
+
+    assert not log_path.with_name("run_vault.jsonl.1").exists()
+    records = _read_records(log_path)
+    assert [record["event"] for record in records] == ["run_started", "run_started", "summary"]
+    assert records[-1]["status"] == "skipped"
@@ -0,0 +1,49 @@
+import pytest
+from utils.file import File
+from utils.index.index_helper import IndexHelper as ih
+from utils.run import RunMetrics
+from fix_indexes import bfs_fix_indexes, fix_weblinks
+from create_jdex import create_jdex
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def metrics_path(memory_file_system, tmp_path, monkeypatch):
+    """Writes the metrics to a temporary file and runs against an in-memory vault"""
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/11 Projects/A topic/note one.md", "see [[Meetings]]", creation_time=1)
+    memory_file_system.add_file(f"{VAULT_PATH}/10-19 Work/Meetings/agenda.md", "[[note one]]", creation_time=2)
+    path = tmp_path / "johnny_vault.prom"
+    monkeypatch.setattr(RunMetrics, "get_path", staticmethod(lambda root_file: str(path)))
+    return path
+
+def _read_samples(path):
+    return dict(line.rsplit(" ", 1) for line in path.read_text().splitlines() if not line.startswith("#"))
+
+def test_writes_run_counts(metrics_path):
+    RunMetrics.start()
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    with RunMetrics.phase("fix"):
+        renames = bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file))
+    fix_weblinks(root_file, renames)
+    create_jdex(root_file)
+    RunMetrics.write(root_file)
+
+    samples = _read_samples(metrics_path)
+    assert samples['johnny_renames_proposed{vault="vault"}'] == "5"
+    assert samples['johnny_renames_applied{vault="vault"}'] == "5"
+    assert samples['johnny_markdown_files_rewritten{vault="vault"}'] == "2"
+    assert samples['johnny_jdex_files_written{vault="vault"}'] == "2"
+    assert samples['johnny_not_indexed_files{vault="vault",area="10-19 Work"}'] == "0"
+    assert 'johnny_phase_duration_seconds{vault="vault",phase="fix"}' in samples
+    assert not metrics_path.with_name(metrics_path.name + ".tmp").exists()
+
+def test_keeps_not_indexed_counts_when_jdex_is_not_regenerated(metrics_path):
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    RunMetrics.start()
+    RunMetrics.start_not_indexed_count()
+    RunMetrics.count_not_indexed("10-19 Work", 3)
+    RunMetrics.write(root_file)
+
+    RunMetrics.start()
+    RunMetrics.write(root_file)
+
+    assert _read_samples(metrics_path)['johnny_not_indexed_files{vault="vault",area="10-19 Work"}'] == "3"
@@ -0,0 +1,33 @@
+from utils.run import SpillQueue
+
+def test_keeps_order_across_spills():
+    """Items come out in insertion order whether they were held in memory or spilled"""
+    with SpillQueue(max_in_memory=3) as queue:
+        popped = []
+        for item in range(10):
+            queue.append([item, f"dir {item}"])
+            if item % 4 == 3:
+                popped.append(queue.popleft()[0])
+        assert len(queue) == 10 - len(popped)
+        while queue:
+            popped.append(queue.popleft()[0])
+
+    assert popped == list(range(10))
+
+def test_holds_at_most_max_in_memory():
+    with SpillQueue(max_in_memory=2) as queue:
+        for item in range(100):
+            queue.append(item)
+        assert len(queue._memory) == 2
+        assert queue.popleft() == 0
+        assert len(queue._memory) <= 2
+
+def test_iterates_without_removing():
+    """Iterating reads spilled items back in order and leaves the queue as it was"""
+    with SpillQueue(max_in_memory=2) as queue:
+        queue.extend(range(6))
+        assert queue.popleft() == 0
+        queue.append(6)
+        assert list(queue) == [1, 2, 3, 4, 5, 6]
+        assert list(queue) == [1, 2, 3, 4, 5, 6]
+        assert [queue.popleft() for _ in range(len(queue))] == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,47 @@
+import os
+import pytest
+from utils.config import ConfigHelper as ch
+from utils.file import File, TreeFingerprint, TreeSnapshot
+from utils.index.index_helper import IndexHelper as ih
+from utils.run import RunMetrics
+from fix_indexes import bfs_fix_indexes
+from tests.helpers import VAULT_PATH
+
+@pytest.fixture
+def file_system(memory_file_system, tmp_path, monkeypatch):
+    """Indexed in-memory vault of 3 categories with 3 topics each, with the fingerprints kept in a temporary directory"""
+    for category in range(3):
+        for topic in range(3):
+            memory_file_system.add_file(f"{VAULT_PATH}/10-19 Area/1{category} Category/1{category}.0{topic} Topic/1{category}.0{topic}-0 Note.md")
+    monkeypatch.setattr(TreeFingerprint, "get_path", staticmethod(lambda root_file, stage: str(tmp_path / f"fingerprints_{stage}.json")))
+    return memory_file_system
+
+def _fix():
+    '''Runs the fix stage with fingerprints. Returns the new names and the directories scanned and skipped'''
+    RunMetrics.start()
+    root_file = File.from_abs_path(VAULT_PATH, -1)
+    fingerprints = TreeFingerprint(root_file, "fix")
+    fingerprints.update()
+    renames = bfs_fix_indexes(root_file, ih.get_areas_in_dir(root_file), fingerprints)
+    fingerprints.save()
+    return [os.path.basename(new_path) for _, new_path in renames], RunMetrics._counts["directories_scanned"], RunMetrics._counts["directories_skipped"]
+
+def _add_file(file_system, abs_path):
+    file_system.add_file(abs_path)
+    TreeSnapshot.invalidate(abs_path)
+
+def test_unchanged_vault_is_skipped_at_its_areas(file_system):
+    assert _fix() == ([], 13, 0) # Area, categories and topics
+    assert _fix() == ([], 0, 1)
+
+def test_deep_change_rescans_only_its_path(file_system):
+    _fix()
+    _add_file(file_system, f"{VAULT_PATH}/10-19 Area/11 Category/11.01 Topic/new.md")
+    # The area, the category and the topic, while the 2 other categories and 2 other topics are skipped
+    assert _fix() == (["11.01-1 new.md"], 3, 4)
+    assert _fix() == ([], 0, 1)
+
+def test_config_change_discards_the_fingerprints(file_system, monkeypatch):
+    _fix()
+    monkeypatch.setattr(ch, "_config", {**ch._load_config(), "unrelated_setting": True})
+    assert _fix() == ([], 13, 0)
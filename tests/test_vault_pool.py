@@ -0,0 +1,19 @@
+import pytest
+from utils.pipeline import VaultPool
+
+def _process_vault(root_path):
+    return "skipped" if root_path.endswith("busy") else "completed"
+
+def test_rejects_vaults_with_the_same_name():
+    with pytest.raises(ValueError, match="both named 'Notes'"):
+        VaultPool.get_root_paths(["/tmp/a/Notes", "/tmp/b/Notes"])
+    assert VaultPool.get_root_paths(["/tmp/a/Notes", "/tmp/b/Other"]) == ["/tmp/a/Notes", "/tmp/b/Other"]
+
+def test_reports_skipped_vaults(config_overrides, tmp_path, monkeypatch, capsys):
+    config_overrides["prompt_for_approval"] = False
+    monkeypatch.setattr(VaultPool, "get_log_path", staticmethod(lambda log_prefix, root_path: str(tmp_path / "vault.log")))
+
+    assert VaultPool.run(_process_vault, ["/tmp/free", "/tmp/busy"], "test") == []
+    output = capsys.readouterr().out
+    assert "Processed '/tmp/free'." in output
+    assert "Skipped '/tmp/busy', another run is processing it." in output
@@ -1,29 +1,58 @@
 import re
-import yaml
+import json
+import hashlib
 from utils.file import File
 
 _CONFIG_FILE_NAME = "config.yaml"
 
 class ConfigHelper:
 
-    @staticmethod    
-    def load_from_config(key):
-        config_path = File.from_name_and_path(_CONFIG_FILE_NAME, File.get_root_path())
+    # Loaded once per process and shared by every stage of a run
+    _config = None
+    _compiled_patterns = None
 
-        with open(config_path.get_abs_path(), 'r') as config_file:
-            config = yaml.safe_load(config_file)
+    @staticmethod
+    def load_from_config(key):
+        config = ConfigHelper._load_config()
         if key not in config:
             raise ValueError(f"Invalid key {key} in {_CONFIG_FILE_NAME}")
 
         return config[key]
 
+    @staticmethod
+    def get_fingerprint():
+        '''Changes whenever the config does, so state persisted under one config isn't trusted under another'''
+        config = json.dumps(ConfigHelper._load_config(), sort_keys=True, default=str)
+        return hashlib.sha1(config.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def reload():
+        ConfigHelper._config = None
+        ConfigHelper._compiled_patterns = None
 
     @staticmethod
     def excluded_from_indexing(file):
         for prefix in ConfigHelper.load_from_config("prefixes_excluded_from_indexing"):
             if file.name.startswith(prefix):
                 return True
-        for pattern in ConfigHelper.load_from_config("patterns_excluded_from_indexing"):
-            if re.match(pattern, file.name):
+        for pattern in ConfigHelper._get_compiled_patterns():
+            if pattern.match(file.name):
                 return True
-        return False
\ No newline at end of file
+        return False
+
+    @staticmethod
+    def _load_config():
+        if ConfigHelper._config is None:
+            import yaml # Imported lazily so that stages which don't need the config start quickly
+
+            config_path = File.from_name_and_path(_CONFIG_FILE_NAME, File.get_root_path())
+            with open(config_path.get_abs_path(), 'r') as config_file:
+                ConfigHelper._config = yaml.safe_load(config_file)
+        return ConfigHelper._config
+
+    @staticmethod
+    def _get_compiled_patterns():
+        if ConfigHelper._compiled_patterns is None:
+            patterns = ConfigHelper.load_from_config("patterns_excluded_from_indexing")
+            ConfigHelper._compiled_patterns = [re.compile(pattern) for pattern in patterns]
+        return ConfigHelper._compiled_patterns
\ No newline at end of file
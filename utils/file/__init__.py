@@ -1 +1,5 @@
-from .file import File
\ No newline at end of file
+from .file import File
+from .tree_snapshot import TreeSnapshot
+from .tree_fingerprint import TreeFingerprint
+from .creation_registry import CreationRegistry
+from .file_system import FileSystem, RealFileSystem, InMemoryFileSystem, CountingFileSystem
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+import json
+from utils.file.tree_snapshot import TreeSnapshot
+from utils.file.file_system import FileSystem
+
+_REGISTRY_FILE_NAME = ".creation_order.json"
+
+class CreationRegistry:
+    '''
+    Persisted first-seen timestamps used to order files that don't have an index yet.
+
+    Every directory keeps its timestamps in a hidden sidecar file, which is read once per directory and synced along
+    with the vault, so the order is the same on every host. A timestamp is only taken (from st_birthtime where the
+    filesystem has it, else st_mtime) the first time an entry is seen.
+    '''
+
+    _registries = {} # Directory path -> {name: first seen timestamp}
+    _dirty_dir_paths = set()
+
+    @staticmethod
+    def get_creation_time(file):
+        '''Returns the first-seen timestamp of file, or None if it doesn't exist'''
+        registry = CreationRegistry._load(file.dir_path)
+        creation_time = registry.get(file.name)
+        if creation_time is None:
+            if not file.exists():
+                return None
+            creation_time = FileSystem.get_active().get_creation_time(file.get_abs_path())
+            registry[file.name] = creation_time
+            CreationRegistry._dirty_dir_paths.add(file.dir_path)
+        return creation_time
+
+    @staticmethod
+    def rename(old_file, new_file):
+        '''
+        Forgets the timestamp of old_file. Files are only renamed to get an index, after which they are ordered by it,
+        so a directory's sidecar disappears once everything in it is indexed.
+        '''
+        old_registry = CreationRegistry._load(old_file.dir_path)
+        if old_registry.pop(old_file.name, None) is not None:
+            CreationRegistry._dirty_dir_paths.add(old_file.dir_path)
+
+        # Sidecars of a renamed directory moved along with it
+        old_path, new_path = old_file.get_abs_path(), new_file.get_abs_path()
+        if not TreeSnapshot.is_dir(new_path):
+            return
+        for dir_path in [dir_path for dir_path in CreationRegistry._registries if dir_path == old_path or dir_path.startswith(old_path + os.sep)]:
+            moved_dir_path = new_path + dir_path[len(old_path):]
+            CreationRegistry._registries[moved_dir_path] = CreationRegistry._registries.pop(dir_path)
+            if dir_path in CreationRegistry._dirty_dir_paths:
+                CreationRegistry._dirty_dir_paths.remove(dir_path)
+                CreationRegistry._dirty_dir_paths.add(moved_dir_path)
+
+    @staticmethod
+    def flush():
+        '''Writes every changed registry back to its sidecar, dropping entries that no longer exist'''
+        from utils.run import ChangeLog # utils.run depends on utils.file
+
+        file_system = FileSystem.get_active()
+        for dir_path in sorted(CreationRegistry._dirty_dir_paths):
+            if not file_system.is_dir(dir_path):
+                continue
+            names = set(TreeSnapshot.list_dir(dir_path))
+            registry = {name: creation_time for name, creation_time in CreationRegistry._registries[dir_path].items() if name in names}
+            CreationRegistry._registries[dir_path] = registry
+
+            registry_path = os.path.join(dir_path, _REGISTRY_FILE_NAME)
+            if registry:
+                temp_path = registry_path + ".tmp"
+                file_system.write_text(temp_path, json.dumps(registry, indent=1, sort_keys=True))
+                file_system.rename(temp_path, registry_path)
+            elif file_system.exists(registry_path):
+                file_system.remove(registry_path)
+            else:
+                continue
+            TreeSnapshot.invalidate(registry_path)
+            ChangeLog.record_path(registry_path)
+
+        CreationRegistry._dirty_dir_paths.clear()
+
+    @staticmethod
+    def clear():
+        CreationRegistry._registries.clear()
+        CreationRegistry._dirty_dir_paths.clear()
+
+    @staticmethod
+    def _load(dir_path):
+        registry = CreationRegistry._registries.get(dir_path)
+        if registry is None:
+            registry = {}
+            registry_path = os.path.join(dir_path, _REGISTRY_FILE_NAME)
+            if TreeSnapshot.exists(registry_path):
+                registry = json.loads(FileSystem.get_active().read_text(registry_path))
+            CreationRegistry._registries[dir_path] = registry
+        return registry
\ No newline at end of file
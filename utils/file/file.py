@@ -1,7 +1,9 @@
 import os
 import copy
-import sys
 from utils.index.index_helper import IndexHelper as ih
+from utils.file.tree_snapshot import TreeSnapshot
+from utils.file.creation_registry import CreationRegistry
+from utils.file.file_system import FileSystem
 from functools import total_ordering
 
 @total_ordering  # Automatically fills in all comparison methods
@@ -13,8 +15,15 @@ class File:
     ### Constants
     @staticmethod
     def get_root_path():
-        script_path = os.path.abspath(sys.argv[0])
-        return os.path.dirname(script_path)
+        # utils/file/file.py -> repository root, independent of which entry point was launched
+        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    @staticmethod
+    def use_file_system(file_system):
+        '''Switches the backend every vault operation goes through and drops everything cached from the previous one'''
+        FileSystem.set_active(file_system)
+        TreeSnapshot.clear()
+        CreationRegistry.clear()
 
     ### Constructors
     @classmethod
@@ -56,14 +65,14 @@ class File:
     
     def get_children(self):
         child_files = []
-        for child_file_name in os.listdir(self.get_abs_path()):
+        for child_file_name in TreeSnapshot.list_dir(self.get_abs_path()):
             child_file = File.from_name_and_path(child_file_name, self.get_abs_path(), self.level + 1)
             child_files.append(child_file)
 
-        return sorted(child_files)
+        return sorted(child_files, key=File.index_sort_key)
     
     def get_siblings(self):
-        return sorted(self.get_parent().get_children())
+        return self.get_parent().get_children()
     
 
     ### Copy Functions
@@ -87,10 +96,10 @@ class File:
         return os.path.join(self.dir_path, self.name)
         
     def is_file(self):
-        return os.path.isfile(self.get_abs_path())
+        return TreeSnapshot.is_file(self.get_abs_path())
         
     def is_dir(self):
-        return os.path.isdir(self.get_abs_path())
+        return TreeSnapshot.is_dir(self.get_abs_path())
 
     def get_extension(self):
         # Returns empty string if extension doesn't exist
@@ -100,42 +109,62 @@ class File:
         return os.path.splitext(self.name)[0]
 
     def get_creation_time(self):
-        return os.stat(self.get_abs_path()).st_birthtime
+        '''First-seen timestamp from the creation registry, None if the file doesn't exist'''
+        return CreationRegistry.get_creation_time(self)
+
+    def get_modified_time(self):
+        return FileSystem.get_active().get_modified_time(self.get_abs_path())
+
+    def get_file_id(self):
+        '''(st_dev, st_ino) of what the path resolves to'''
+        return FileSystem.get_active().get_file_id(self.get_abs_path())
 
     def exists(self):
-        return os.path.exists(self.get_abs_path())
+        return TreeSnapshot.exists(self.get_abs_path())
     
     ### File Modification Functions
     def delete(self):
         if self.is_file():
-            os.remove(self.get_abs_path())
+            TreeSnapshot.invalidate(self.get_abs_path())
+            FileSystem.get_active().remove(self.get_abs_path())
         else:
             raise ValueError(f"Can't delete. {self.name} is a directory.")
     
+    def read_text(self):
+        return FileSystem.get_active().read_text(self.get_abs_path())
+
+    def write_text(self, content):
+        is_new = not self.exists()
+        FileSystem.get_active().write_text(self.get_abs_path(), content)
+        if is_new:
+            TreeSnapshot.invalidate(self.get_abs_path())
+
     def rename(self, new_file):
-        os.rename(self.get_abs_path(), new_file.get_abs_path())
+        TreeSnapshot.invalidate(self.get_abs_path())
+        FileSystem.get_active().rename(self.get_abs_path(), new_file.get_abs_path())
+        TreeSnapshot.invalidate(new_file.get_abs_path())
+        CreationRegistry.rename(self, new_file)
         self.copy_from(new_file)
 
     @staticmethod
     def index_sort_key(file):
-        parent_file_index = float('inf')
-        try:
-            parent_file = file.get_parent()
-            parent_file_index = float(ih.get_index(parent_file))
-        except:
-            pass
-
-        main_index = float('inf')
-        try:
-            main_index = float(ih.get_main_index(file))
-        except:
-            pass
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        # Only matters when files of different directories are sorted together
+        parent_jd_index = ih.get_jd_index(file.get_parent())
+        parent_sort_key = parent_jd_index.sort_key if parent_jd_index is not None else (float('inf'),)
+        main_sort_key = ih.get_main_sort_key(file)
 
+        # Only files without an index are ordered by when they were first seen, and only in directories the fix renumbers
+        # (areas and indexed directories), so walks elsewhere, e.g. over the vault root, leave no registry behind.
+        # Everything else, and any remaining tie, is ordered by name so that the order is deterministic on every host
         creation_time = float('inf')
-        if file.exists():
+        if main_sort_key == ih.NOT_INDEXED_SORT_KEY and parent_jd_index is not None and not ch.excluded_from_indexing(file):
             creation_time = file.get_creation_time()
+            if creation_time is None:
+                creation_time = float('inf')
 
-        return (parent_file_index, main_index, creation_time)
+        return (parent_sort_key, main_sort_key, creation_time, file.name)
             
 
     ### Class functions
@@ -0,0 +1,287 @@
+import os
+import time
+from collections import Counter
+
+class FileSystem:
+    '''
+    The operations the indexer performs on a vault. Everything that touches the vault goes through the active backend,
+    so the whole pipeline can run against the real disk, an in-memory tree or a wrapper that counts operations.
+    Files outside the vault (config, logs) are always accessed directly.
+    '''
+
+    _active = None
+
+    @staticmethod
+    def get_active():
+        if FileSystem._active is None:
+            FileSystem._active = RealFileSystem()
+        return FileSystem._active
+
+    @staticmethod
+    def set_active(file_system):
+        '''Prefer File.use_file_system, which also drops the caches built on top of the previous backend'''
+        FileSystem._active = file_system
+
+    def list_dir(self, dir_path):
+        '''Returns (name, is_dir) for every file and directory in the directory'''
+        raise NotImplementedError
+
+    def is_dir(self, path):
+        raise NotImplementedError
+
+    def is_file(self, path):
+        raise NotImplementedError
+
+    def exists(self, path):
+        raise NotImplementedError
+
+    def get_creation_time(self, path):
+        raise NotImplementedError
+
+    def get_modified_time(self, path):
+        raise NotImplementedError
+
+    def get_file_id(self, path):
+        '''Identifies what path resolves to, so traversals notice when they reach the same directory or file twice'''
+        raise NotImplementedError
+
+    def rename(self, src_path, dst_path):
+        '''Moves src_path to dst_path, replacing dst_path if it is a file'''
+        raise NotImplementedError
+
+    def remove(self, path):
+        raise NotImplementedError
+
+    def read_text(self, path):
+        raise NotImplementedError
+
+    def write_text(self, path, content):
+        raise NotImplementedError
+
+class RealFileSystem(FileSystem):
+    '''
+    The disk. Symlinks are left out of listings unless follow_symlinks is set in the config, as a link back up the
+    tree would otherwise make every traversal loop.
+    '''
+
+    def __init__(self):
+        self._follow_symlinks = None # Read from the config on first use
+
+    def list_dir(self, dir_path):
+        follow_symlinks = self._get_follow_symlinks()
+        # scandir reports entry types without an extra stat per entry
+        listing = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if not follow_symlinks and entry.is_symlink():
+                    continue
+                is_dir = entry.is_dir()
+                if is_dir or entry.is_file(): # Neither for dangling symlinks, sockets and the like, which have nothing to index
+                    listing.append((entry.name, is_dir))
+        return listing
+
+    def is_dir(self, path):
+        return os.path.isdir(path)
+
+    def is_file(self, path):
+        return os.path.isfile(path)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def get_creation_time(self, path):
+        stat = os.stat(path)
+        return getattr(stat, "st_birthtime", stat.st_mtime)
+
+    def get_modified_time(self, path):
+        return os.stat(path).st_mtime
+
+    def get_file_id(self, path):
+        stat = os.stat(path)
+        return (stat.st_dev, stat.st_ino)
+
+    def rename(self, src_path, dst_path):
+        os.replace(src_path, dst_path)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def read_text(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write_text(self, path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _get_follow_symlinks(self):
+        if self._follow_symlinks is None:
+            from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+            self._follow_symlinks = ch.load_from_config("follow_symlinks")
+        return self._follow_symlinks
+
+class InMemoryFileSystem(FileSystem):
+    '''
+    A vault held in nested dicts. Directories are dicts and files are _InMemoryFile objects. Lets benchmarks and tests
+    build trees with 100k+ entries in seconds without touching the disk.
+    '''
+
+    def __init__(self):
+        self._root = {}
+        self._modified_times = {} # Path -> modified time set with set_modified_time
+
+    def add_dir(self, path):
+        directory = self._root
+        for part in self._split(path):
+            directory = directory.setdefault(part, {})
+            if not isinstance(directory, dict):
+                raise NotADirectoryError(path)
+
+    def add_file(self, path, content="", creation_time=None):
+        self.add_dir(os.path.dirname(path))
+        self._get_parent(path)[os.path.basename(path)] = _InMemoryFile(content, creation_time)
+
+    def list_dir(self, dir_path):
+        directory = self._get(dir_path)
+        if not isinstance(directory, dict):
+            raise NotADirectoryError(dir_path)
+        return [(name, isinstance(entry, dict)) for name, entry in directory.items()]
+
+    def is_dir(self, path):
+        return isinstance(self._get(path, None), dict)
+
+    def is_file(self, path):
+        return isinstance(self._get(path, None), _InMemoryFile)
+
+    def exists(self, path):
+        return self._get(path, None) is not None
+
+    def get_creation_time(self, path):
+        entry = self._get(path)
+        return entry.creation_time if isinstance(entry, _InMemoryFile) else 0.0
+
+    def get_modified_time(self, path):
+        self._get(path)
+        return self._modified_times.get(os.path.abspath(path), 0.0)
+
+    def get_file_id(self, path):
+        return (0, id(self._get(path)))
+
+    def add_link(self, path, target_path):
+        '''Makes path another name of target_path, like a followed symlink or a hard link'''
+        self.add_dir(os.path.dirname(path))
+        self._get_parent(path)[os.path.basename(path)] = self._get(target_path)
+
+    def set_modified_time(self, path, modified_time):
+        self._modified_times[os.path.abspath(path)] = modified_time
+
+    def rename(self, src_path, dst_path):
+        entry = self._get_parent(src_path).pop(os.path.basename(src_path), None)
+        if entry is None:
+            raise FileNotFoundError(src_path)
+        self._get_parent(dst_path)[os.path.basename(dst_path)] = entry
+
+    def remove(self, path):
+        if not self.is_file(path):
+            raise FileNotFoundError(path)
+        del self._get_parent(path)[os.path.basename(path)]
+
+    def read_text(self, path):
+        entry = self._get(path)
+        if not isinstance(entry, _InMemoryFile):
+            raise IsADirectoryError(path)
+        return entry.content
+
+    def write_text(self, path, content):
+        entry = self._get(path, None)
+        if isinstance(entry, _InMemoryFile):
+            entry.content = content
+        else:
+            self._get_parent(path)[os.path.basename(path)] = _InMemoryFile(content)
+
+    def _split(self, path):
+        return [part for part in os.path.abspath(path).split(os.sep) if part]
+
+    def _get(self, path, default=FileNotFoundError):
+        entry = self._root
+        for part in self._split(path):
+            entry = entry.get(part) if isinstance(entry, dict) else None
+            if entry is None:
+                if default is FileNotFoundError:
+                    raise FileNotFoundError(path)
+                return default
+        return entry
+
+    def _get_parent(self, path):
+        parent = self._get(os.path.dirname(path))
+        if not isinstance(parent, dict):
+            raise NotADirectoryError(path)
+        return parent
+
+class _InMemoryFile:
+    def __init__(self, content, creation_time=None):
+        self.content = content
+        self.creation_time = time.time() if creation_time is None else creation_time
+
+class CountingFileSystem(FileSystem):
+    '''
+    Wraps another backend and records every operation, e.g. to assert a budget of one list_dir per directory per run.
+    '''
+
+    def __init__(self, file_system):
+        self.file_system = file_system
+        self.operations = [] # (operation, path) in call order
+        self.counts = Counter()
+
+    def reset(self):
+        self.operations.clear()
+        self.counts.clear()
+
+    def _record(self, operation, path):
+        self.operations.append((operation, path))
+        self.counts[operation] += 1
+
+    def list_dir(self, dir_path):
+        self._record("list_dir", dir_path)
+        return self.file_system.list_dir(dir_path)
+
+    def is_dir(self, path):
+        self._record("is_dir", path)
+        return self.file_system.is_dir(path)
+
+    def is_file(self, path):
+        self._record("is_file", path)
+        return self.file_system.is_file(path)
+
+    def exists(self, path):
+        self._record("exists", path)
+        return self.file_system.exists(path)
+
+    def get_creation_time(self, path):
+        self._record("get_creation_time", path)
+        return self.file_system.get_creation_time(path)
+
+    def get_modified_time(self, path):
+        self._record("get_modified_time", path)
+        return self.file_system.get_modified_time(path)
+
+    def get_file_id(self, path):
+        self._record("get_file_id", path)
+        return self.file_system.get_file_id(path)
+
+    def rename(self, src_path, dst_path):
+        self._record("rename", src_path)
+        return self.file_system.rename(src_path, dst_path)
+
+    def remove(self, path):
+        self._record("remove", path)
+        return self.file_system.remove(path)
+
+    def read_text(self, path):
+        self._record("read_text", path)
+        return self.file_system.read_text(path)
+
+    def write_text(self, path, content):
+        self._record("write_text", path)
+        return self.file_system.write_text(path, content)
\ No newline at end of file
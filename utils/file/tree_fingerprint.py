@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+from utils.file.file import File
+from utils.file.tree_snapshot import TreeSnapshot
+from utils.file.file_system import FileSystem
+
+_LOGS_DIR_NAME = "logs"
+
+# Entries the indexer never reads or only generates itself (hidden files, sidecars, JDex files)
+_IGNORED_PREFIXES = (".", "Index of ")
+
+# Stands in for a directory reached again through another path, e.g. a symlink, whose contents are covered where it was first reached
+_REVISITED_FINGERPRINT = "revisited"
+
+class TreeFingerprint:
+    '''
+    Merkle-style fingerprints of the directories of a vault. A directory's fingerprint is a hash of the names and types
+    of its children and the fingerprints of its child directories, so unlike mtimes it doesn't change when a sync client
+    touches directory metadata, and a change deep in the tree only changes the fingerprints on its path up to the root.
+
+    Every stage keeps the fingerprints of the tree it last completed on in logs/. A directory whose fingerprint still
+    matches is proven unchanged, along with everything below it, by comparing one hash, and the stage can skip it.
+    '''
+
+    _computed = {} # (root path, TreeSnapshot.version) -> fingerprints, shared by the stages of a run
+
+    def __init__(self, root_file, stage):
+        self.root_file = root_file
+        self._path = TreeFingerprint.get_path(root_file, stage)
+        self._stored = self._load()
+        self._current = {}
+        self._incomplete = set() # Relative paths of directories the stage didn't finish fixing
+
+    @staticmethod
+    def get_path(root_file, stage):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"fingerprints_{stage}_{root_file.name}.json")
+
+    def update(self):
+        '''Fingerprints the vault as it is now'''
+        self._current = TreeFingerprint.compute(self.root_file)
+
+    def is_unchanged(self, dir_file):
+        '''Whether dir_file and everything below it are the same as when the stage last completed'''
+        relative_path = os.path.relpath(dir_file.get_abs_path(), self.root_file.get_abs_path())
+        fingerprint = self._current.get(relative_path)
+        return fingerprint is not None and self._stored.get(relative_path) == fingerprint
+
+    def mark_incomplete(self, dir_file):
+        '''Keeps dir_file, everything below it and its ancestors from counting as completed when the stage saves'''
+        self._incomplete.add(os.path.relpath(dir_file.get_abs_path(), self.root_file.get_abs_path()))
+
+    def forget(self, dir_files):
+        '''
+        Stops trusting what is stored about dir_files, everything below them and their ancestors, e.g. once their
+        output was regenerated outside the stage, and writes the rest back
+        '''
+        dir_paths = {os.path.relpath(dir_file.get_abs_path(), self.root_file.get_abs_path()) for dir_file in dir_files}
+        forgotten_paths = set(dir_paths)
+        for dir_path in dir_paths:
+            forgotten_paths.update(_get_ancestors(dir_path))
+        self._stored = {relative_path: fingerprint for relative_path, fingerprint in self._stored.items()
+                        if relative_path not in forgotten_paths and not any(ancestor in dir_paths for ancestor in _get_ancestors(relative_path))}
+        self._write()
+
+    def save(self):
+        '''Records the vault as it is now as the tree the stage last completed on, except where marked incomplete'''
+        self.update()
+        # A directory is incomplete if it or one of its ancestors was marked, or if one of its descendants was
+        incomplete_paths = set(self._incomplete)
+        for incomplete_path in self._incomplete:
+            incomplete_paths.update(_get_ancestors(incomplete_path))
+        self._stored = {relative_path: fingerprint for relative_path, fingerprint in self._current.items()
+                        if relative_path not in incomplete_paths and not any(ancestor in self._incomplete for ancestor in _get_ancestors(relative_path))}
+        self._incomplete = set()
+        self._write()
+
+    def _write(self):
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"config": ch.get_fingerprint(), "fingerprints": self._stored}, f)
+        os.replace(temp_path, self._path)
+
+    @staticmethod
+    def compute(root_file):
+        '''Returns the fingerprint of every directory below root_file, keyed by path relative to root_file'''
+        root_path = root_file.get_abs_path()
+        cache_key = (root_path, TreeSnapshot.version)
+        fingerprints = TreeFingerprint._computed.get(cache_key)
+        if fingerprints is not None:
+            return fingerprints
+
+        dir_fingerprints = {}
+        visited_ids = set()
+        # Post-order walk without recursion: a directory is hashed once all its child directories are
+        stack = [(root_path, False)]
+        while stack:
+            dir_path, children_done = stack.pop()
+            if not children_done:
+                dir_id = FileSystem.get_active().get_file_id(dir_path)
+                if dir_id in visited_ids:
+                    dir_fingerprints[dir_path] = _REVISITED_FINGERPRINT
+                    continue
+                visited_ids.add(dir_id)
+
+            entries = sorted((name, is_dir) for name, is_dir in TreeSnapshot.list_entries(dir_path) if not name.startswith(_IGNORED_PREFIXES))
+            if not children_done:
+                stack.append((dir_path, True))
+                stack.extend((os.path.join(dir_path, name), False) for name, is_dir in entries if is_dir)
+                continue
+
+            digest = hashlib.sha1()
+            for name, is_dir in entries:
+                child_fingerprint = dir_fingerprints[os.path.join(dir_path, name)] if is_dir else ""
+                digest.update(f"{name}\0{'d' if is_dir else 'f'}\0{child_fingerprint}\n".encode("utf-8"))
+            dir_fingerprints[dir_path] = digest.hexdigest()
+
+        fingerprints = {os.path.relpath(dir_path, root_path): fingerprint for dir_path, fingerprint in dir_fingerprints.items()}
+        TreeFingerprint._computed = {cache_key: fingerprints}
+        return fingerprints
+
+    def _load(self):
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        if not os.path.exists(self._path):
+            return {}
+        with open(self._path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        # Fingerprints taken under a different config prove nothing, e.g. exclusions may have changed
+        if stored.get("config") != ch.get_fingerprint():
+            return {}
+        return stored["fingerprints"]
+
+def _get_ancestors(relative_path):
+    '''Paths of the directories above relative_path up to the root, which is os.curdir'''
+    ancestors = []
+    while relative_path != os.curdir:
+        relative_path = os.path.dirname(relative_path) or os.curdir
+        ancestors.append(relative_path)
+    return ancestors
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+import threading
+from utils.file.file_system import FileSystem
+
+class TreeSnapshot:
+    '''
+    Caches directory listings, along with the type of every listed entry, for the lifetime of the process. This lets
+    every stage of a run share one walk of the vault. Anything that adds, removes or renames entries must invalidate.
+    Once the listings hold more entries than the configured memory budget, the oldest are dropped and re-read if needed.
+    Stages running in parallel threads share it, so changes to the listings are made under a lock.
+    '''
+
+    _listings = {} # Directory path -> {child name: is directory}, oldest first
+    _num_entries = 0
+    _max_entries = None
+    version = 0 # Changes whenever something is invalidated, so results derived from the snapshot can be reused until then
+    _lock = threading.RLock()
+
+    @staticmethod
+    def list_dir(dir_path):
+        return list(TreeSnapshot._get_listing(dir_path))
+
+    @staticmethod
+    def list_entries(dir_path):
+        '''Returns (name, is_dir) for every file and directory in the directory'''
+        return list(TreeSnapshot._get_listing(dir_path).items())
+
+    @staticmethod
+    def is_dir(abs_path):
+        listing = TreeSnapshot._listings.get(os.path.dirname(abs_path))
+        if listing is None:
+            return FileSystem.get_active().is_dir(abs_path)
+        return listing.get(os.path.basename(abs_path), False)
+
+    @staticmethod
+    def is_file(abs_path):
+        listing = TreeSnapshot._listings.get(os.path.dirname(abs_path))
+        if listing is None:
+            return FileSystem.get_active().is_file(abs_path)
+        return listing.get(os.path.basename(abs_path), True) is False
+
+    @staticmethod
+    def exists(abs_path):
+        listing = TreeSnapshot._listings.get(os.path.dirname(abs_path))
+        if listing is None:
+            return FileSystem.get_active().exists(abs_path)
+        return os.path.basename(abs_path) in listing
+
+    @staticmethod
+    def invalidate(abs_path):
+        '''Forgets the listing of abs_path's parent directory, and of abs_path and everything below it if it is a directory.
+        Call this while abs_path still exists when it is about to be removed or renamed.
+        '''
+        with TreeSnapshot._lock:
+            TreeSnapshot.version += 1
+            is_dir = TreeSnapshot.is_dir(abs_path)
+            TreeSnapshot._drop(os.path.dirname(abs_path))
+            if not is_dir:
+                return
+
+            prefix = abs_path + os.sep
+            for dir_path in [dir_path for dir_path in TreeSnapshot._listings if dir_path == abs_path or dir_path.startswith(prefix)]:
+                TreeSnapshot._drop(dir_path)
+
+    @staticmethod
+    def clear():
+        with TreeSnapshot._lock:
+            TreeSnapshot.version += 1
+            TreeSnapshot._listings.clear()
+            TreeSnapshot._num_entries = 0
+            TreeSnapshot._max_entries = None
+
+    @staticmethod
+    def _get_listing(dir_path):
+        listing = TreeSnapshot._listings.get(dir_path)
+        if listing is None:
+            with TreeSnapshot._lock:
+                listing = dict(FileSystem.get_active().list_dir(dir_path))
+                TreeSnapshot._listings[dir_path] = listing
+                TreeSnapshot._num_entries += len(listing)
+
+                max_entries = TreeSnapshot._get_max_entries()
+                while TreeSnapshot._num_entries > max_entries and len(TreeSnapshot._listings) > 1:
+                    TreeSnapshot._drop(next(iter(TreeSnapshot._listings)))
+        return listing
+
+    @staticmethod
+    def _drop(dir_path):
+        listing = TreeSnapshot._listings.pop(dir_path, None)
+        if listing is not None:
+            TreeSnapshot._num_entries -= len(listing)
+
+    @staticmethod
+    def _get_max_entries():
+        if TreeSnapshot._max_entries is None:
+            from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+            TreeSnapshot._max_entries = ch.load_from_config("max_entries_in_memory")
+        return TreeSnapshot._max_entries
\ No newline at end of file
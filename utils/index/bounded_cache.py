@@ -0,0 +1,37 @@
+import threading
+
+class BoundedCache:
+    '''
+    A dict that drops its oldest entries once it holds more than max_entries_in_memory, so caches keyed by file or index
+    text stay within the memory budget however large the vault is. Dropped entries are recomputed when needed.
+    '''
+
+    def __init__(self):
+        self._entries = {} # Oldest first
+        self._max_entries = None
+        self._lock = threading.Lock() # Stages running in parallel threads share the caches
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            max_entries = self._get_max_entries()
+            while len(self._entries) > max_entries:
+                self._entries.pop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._max_entries = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_max_entries(self):
+        if self._max_entries is None:
+            from utils.config import ConfigHelper as ch # utils.config depends on utils.file, which depends on utils.index
+
+            self._max_entries = ch.load_from_config("max_entries_in_memory")
+        return self._max_entries
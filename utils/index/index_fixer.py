@@ -1,18 +1,21 @@
 from utils.index.index_helper import IndexHelper as ih
 from utils.config.config_helper import ConfigHelper as ch
+from utils.file import File, TreeSnapshot
 
 class IndexFixer:
     '''
     This class holds the create index algorithm
     '''
 
+    _sibling_positions = (None, {}) # (directory path, level, TreeSnapshot.version) of the last directory -> positions
+
     @staticmethod
     def _prefix_zeroes(file, main_index):
         '''This ensures that all indexes in one directory are the same length'''
         if ih.is_category(file.get_parent(), proper = True): # Topics are special where we want the main index to have 2 digits (Eg: 12.01)
             desired_main_index_len = 2
         else:
-            num_indexed_files = sum(1 for sibling in file.get_siblings() if not ch.excluded_from_indexing(sibling)) - 1
+            num_indexed_files = len(IndexFixer._get_sibling_positions(file)) - 1
             desired_main_index_len = len(str(num_indexed_files))
 
         return str(main_index).zfill(desired_main_index_len)
@@ -24,15 +27,25 @@ class IndexFixer:
         if ih.is_extension(file, proper = False):
             return ih.get_main_index(file)
 
-        indexed_files_in_dir = [sibling for sibling in file.get_siblings() if not ch.excluded_from_indexing(sibling)]
-        indexed_files_in_dir.sort()
-
         # ToDo: We need to validate that only 10 areas and categories, or 100 topics, subtopics and extensions can exist
 
-        file_position = indexed_files_in_dir.index(file)
+        file_position = IndexFixer._get_sibling_positions(file)[file.name]
         main_index = IndexFixer._prefix_zeroes(file, file_position)
         return main_index
     
+    @staticmethod
+    def _get_sibling_positions(file):
+        '''
+        Positions of file and its siblings that aren't excluded, in index order. Computed once per directory while the
+        tree snapshot is unchanged instead of re-sorting the siblings for every file.
+        '''
+        cache_key = (file.dir_path, file.level, TreeSnapshot.version)
+        if IndexFixer._sibling_positions[0] != cache_key:
+            indexed_files_in_dir = [sibling for sibling in file.get_siblings() if not ch.excluded_from_indexing(sibling)]
+            indexed_files_in_dir.sort(key=File.index_sort_key)
+            IndexFixer._sibling_positions = (cache_key, {sibling.name: position for position, sibling in enumerate(indexed_files_in_dir)})
+        return IndexFixer._sibling_positions[1]
+
     @staticmethod
     def _compute_parent_index(child_file):
         parent_file = child_file.get_parent()
@@ -54,4 +67,22 @@ class IndexFixer:
         parent_index = IndexFixer._compute_parent_index(file)
         main_index = IndexFixer._compute_new_main_index(file)
         ih.update_index_from_portions(file, parent_index, main_index)
-    
\ No newline at end of file
+
+    @staticmethod
+    def propose_index_for_new_file(file):
+        '''Returns a copy of a file that doesn't exist yet, named the way the next run would index it'''
+        new_file = file.create_copy()
+        if ch.excluded_from_indexing(new_file):
+            return new_file
+
+        # A new file is the most recently seen one, so it goes after all of its siblings
+        num_siblings = sum(1 for sibling in new_file.get_siblings() if not ch.excluded_from_indexing(sibling) and sibling.name != new_file.name)
+        if ih.is_category(new_file.get_parent(), proper = True):
+            desired_main_index_len = 2
+        else:
+            desired_main_index_len = len(str(num_siblings))
+
+        parent_index = IndexFixer._compute_parent_index(new_file)
+        main_index = str(num_siblings).zfill(desired_main_index_len)
+        ih.update_index_from_portions(new_file, parent_index, main_index)
+        return new_file
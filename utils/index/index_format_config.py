@@ -151,8 +151,14 @@ class ProperIndexType:
     def get_index_config(self):
         if self == PROPER_NOT_INDEXED:
             raise ValueError("No configuration for Not Indexed files")
-        it = self.idx_type.value
-        return _IndexConfigurator(self.proper, it["proper_index_patterns"], it["improper_index_patterns"], it["levels"], it["type"](), it["parents"](), it["separator"])
+        # Configurators are immutable, so one per type is built and shared
+        cache_key = (self.idx_type, bool(self.proper))
+        index_config = _index_configs.get(cache_key)
+        if index_config is None:
+            it = self.idx_type.value
+            index_config = _IndexConfigurator(self.proper, it["proper_index_patterns"], it["improper_index_patterns"], it["levels"], it["type"](), it["parents"](), it["separator"])
+            _index_configs[cache_key] = index_config
+        return index_config
 
     def __str__(self):
         proper_text = "proper" if self.proper else "improper"
@@ -167,10 +173,11 @@ class ProperIndexType:
 
 class _IndexConfigurator:
     def __init__(self, proper, proper_index_patterns, improper_index_patterns, levels, index_type, parent_index_types, separator):
-        self._patterns = copy.deepcopy(proper_index_patterns)
+        patterns = copy.deepcopy(proper_index_patterns)
         for pattern in improper_index_patterns:
-            if not proper and pattern not in self._patterns:
-                self._patterns.append(pattern)
+            if not proper and pattern not in patterns:
+                patterns.append(pattern)
+        self._patterns = [re.compile(pattern) for pattern in patterns]
 
         self._levels = levels
         self._index_type = index_type
@@ -178,15 +185,14 @@ class _IndexConfigurator:
         self._separator = separator
     
     def validate(self, file):
-        index = self._get_index_without_validation(file)
-        if index is None:
-            return False
+        # Cheapest checks first. The parent's type is only looked up for names that match
         if file.level not in self._levels:
             return False
-        if file.get_parent().index_type() not in self._parent_index_types:
+        index = self._get_index_without_validation(file)
+        if not any(pattern.match(index) for pattern in self._patterns):
             return False
 
-        return any(re.match(pattern, index) for pattern in self._patterns)
+        return file.get_parent().index_type() in self._parent_index_types
 
     def get_index(self, file):
         index = self._get_index_without_validation(file)
@@ -224,7 +230,7 @@ class _IndexConfigurator:
         
         index = self.get_index(file)
         for pattern in self._patterns:
-            match = re.compile(pattern).match(index)
+            match = pattern.match(index)
             if not match:
                 continue
             
@@ -238,5 +244,7 @@ class _IndexConfigurator:
     def _get_index_without_validation(self, file):
         return file.name.split(_INDEX_SEPARATOR)[0]
 
+_index_configs = {} # (BaseIndexType, proper) -> _IndexConfigurator
+
 # Parents
 PROPER_NOT_INDEXED = ProperIndexType(BaseIndexType.NOT_INDEXED, proper = False)
\ No newline at end of file
@@ -1,10 +1,16 @@
 from utils.index.index_format_config import ProperIndexType, BaseIndexType, PROPER_NOT_INDEXED
+from utils.index.jd_index import JDIndex
+from utils.index.bounded_cache import BoundedCache
 
 class IndexHelper:
     '''
     This class serves as a layer of abstraction on top of IndexConfigs. It holds functions related to index
     '''
 
+    _index_type_cache = BoundedCache() # (dir path, name, level) -> ProperIndexType
+    num_classified = 0 # Cache misses, reported in the run metrics
+    NOT_INDEXED_SORT_KEY = (2,) # Main sort key of files without an index, after every index
+
     @staticmethod
     def is_index(file, proper):
         ''' Checks if the file is indexed. Set proper to True to validate that the script correctly set the index.
@@ -15,9 +21,40 @@ class IndexHelper:
     @staticmethod
     def get_index(file):
         return IndexHelper._get_index_config_from_file(file).get_index(file)
+
+    @staticmethod
+    def get_jd_index(file):
+        '''Parsed index of a properly indexed file, None if it isn't one or its index doesn't encode its ancestry'''
+        if not IndexHelper.is_index(file, proper = True):
+            return None
+        return JDIndex.parse(IndexHelper.get_index(file))
+
+    @staticmethod
+    def get_main_sort_key(file):
+        '''Orders siblings: by main index, then extensions by their letters, then files without an index'''
+        jd_index = IndexHelper.get_jd_index(file)
+        if jd_index is not None:
+            return jd_index.main_sort_key
+        if IndexHelper.is_index(file, proper = False):
+            try:
+                return (0, float(IndexHelper.get_main_index(file))) # Improper indexes like 12.34.5 go between 12.34 and 12.35
+            except (TypeError, ValueError):
+                pass
+        return IndexHelper.NOT_INDEXED_SORT_KEY
     
     @staticmethod
     def get_index_type(file):
+        # A file's index type only depends on its path and level, so it is classified once while it stays in the cache
+        cache_key = (file.dir_path, file.name, file.level)
+        index_type = IndexHelper._index_type_cache.get(cache_key)
+        if index_type is None:
+            index_type = IndexHelper._classify(file)
+            IndexHelper._index_type_cache.put(cache_key, index_type)
+            IndexHelper.num_classified += 1
+        return index_type
+
+    @staticmethod
+    def _classify(file):
         for proper in [True, False]:
             for index_type in BaseIndexType:
                 if index_type == BaseIndexType.NOT_INDEXED:
@@ -0,0 +1,147 @@
+import re
+from functools import total_ordering
+from utils.index.bounded_cache import BoundedCache
+
+# Every proper index that encodes its ancestry: Y0-Y9, XY, XY.ZZ, XY.ZZ+SUFF, XY.ZZ-N and XY.ZZ+SUFF-N
+_JD_INDEX_PATTERN = re.compile(
+    r'^(?:(?P<area>[0-9])0-(?P=area)9'
+    r'|(?P<category>[0-9]{2})(?:\.(?P<topic>[0-9]{2})(?:\+(?P<extension>[A-Z]+))?(?:-(?P<subtopic>[0-9]+))?)?)$'
+)
+_NOT_PARSED = object() # Cache default, as None is cached for text that isn't a proper index
+
+@total_ordering
+class JDIndex:
+    '''
+    A parsed proper index, e.g. 12.34+A-2: integer components plus the extension letters. Immutable and hashable.
+
+    Unlike the regex configs, which classify a file together with its parent directory, a JDIndex only knows the index
+    itself. Since a proper index encodes its whole ancestry, the parent index and the level are derived from it, and
+    comparing or sorting indexes compares tuples instead of splitting strings and casting them to floats.
+    Indexes that don't encode their ancestry (the plain numbers below subtopics) and improper indexes don't parse.
+    '''
+
+    __slots__ = ("area", "category", "topic", "extension", "subtopic", "_text", "_sort_key")
+
+    _parsed = BoundedCache() # Index text -> JDIndex or None
+
+    def __init__(self, area, category=None, topic=None, extension=None, subtopic=None, text=None):
+        object.__setattr__(self, "area", area)
+        object.__setattr__(self, "category", category)
+        object.__setattr__(self, "topic", topic)
+        object.__setattr__(self, "extension", extension)
+        object.__setattr__(self, "subtopic", subtopic)
+        object.__setattr__(self, "_text", text)
+        # Extensions are ordered like spreadsheet columns (A, ..., Z, AA) and after the subtopics of their topic
+        extension_key = (-1, "") if extension is None else (len(extension), extension)
+        object.__setattr__(self, "_sort_key", (area, _or_minus_one(category), _or_minus_one(topic), extension_key, _or_minus_one(subtopic)))
+
+    @staticmethod
+    def parse(text):
+        '''Returns the JDIndex of an index like "12.34", or None if it isn't a proper index that encodes its ancestry'''
+        jd_index = JDIndex._parsed.get(text, _NOT_PARSED)
+        if jd_index is not _NOT_PARSED:
+            return jd_index
+
+        jd_index = None
+        match = _JD_INDEX_PATTERN.match(text)
+        if match is not None:
+            if match.group("area") is not None:
+                jd_index = JDIndex(int(match.group("area")), text=text)
+            else:
+                category = int(match.group("category"))
+                topic = _int_or_none(match.group("topic"))
+                jd_index = JDIndex(category // 10, category, topic, match.group("extension"), _int_or_none(match.group("subtopic")), text)
+
+        JDIndex._parsed.put(text, jd_index)
+        return jd_index
+
+    @property
+    def level(self):
+        '''Level of the files with this index, 0 for areas'''
+        if self.subtopic is not None:
+            return 4 if self.extension is not None else 3
+        if self.extension is not None:
+            return 3
+        if self.topic is not None:
+            return 2
+        if self.category is not None:
+            return 1
+        return 0
+
+    def parent(self):
+        '''Index of the directory this index belongs in, None for areas'''
+        if self.subtopic is not None:
+            return JDIndex(self.area, self.category, self.topic, self.extension)
+        if self.extension is not None:
+            return JDIndex(self.area, self.category, self.topic)
+        if self.topic is not None:
+            return JDIndex(self.area, self.category)
+        if self.category is not None:
+            return JDIndex(self.area)
+        return None
+
+    def ancestors(self):
+        '''Indexes from the area down to this index'''
+        ancestors = []
+        jd_index = self
+        while jd_index is not None:
+            ancestors.append(jd_index)
+            jd_index = jd_index.parent()
+        return ancestors[::-1]
+
+    @property
+    def sort_key(self):
+        return self._sort_key
+
+    @property
+    def main_sort_key(self):
+        '''Orders siblings: numbered indexes by their main index, then extensions by their letters'''
+        if self.subtopic is not None:
+            return (0, self.subtopic)
+        if self.extension is not None:
+            return (1, len(self.extension), self.extension)
+        if self.topic is not None:
+            return (0, self.topic)
+        if self.category is not None:
+            return (0, self.category % 10)
+        return (0, self.area)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("JDIndex is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, JDIndex):
+            return NotImplemented
+        return self._sort_key == other._sort_key
+
+    def __lt__(self, other):
+        if not isinstance(other, JDIndex):
+            return NotImplemented
+        return self._sort_key < other._sort_key
+
+    def __hash__(self):
+        return hash(self._sort_key)
+
+    def __str__(self):
+        if self._text is not None:
+            return self._text # Keeps the zero padding of subtopics
+
+        if self.category is None:
+            return f"{self.area}0-{self.area}9"
+        text = f"{self.category:02}"
+        if self.topic is not None:
+            text += f".{self.topic:02}"
+        if self.extension is not None:
+            text += f"+{self.extension}"
+        if self.subtopic is not None:
+            text += f"-{self.subtopic}"
+        return text
+
+    def __repr__(self):
+        return f"JDIndex('{self}')"
+
+def _int_or_none(text):
+    return None if text is None else int(text)
+
+def _or_minus_one(value):
+    return -1 if value is None else value
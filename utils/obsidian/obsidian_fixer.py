@@ -1,5 +1,12 @@
 from utils.config.config_helper import ConfigHelper
+from utils.run import ChangeLog, RunLog, RunMetrics
+import os
 import re
+import queue
+import threading
+
+# Markdown files held between the reading, rewriting and writing threads
+_MAX_QUEUED_FILES = 64
 
 class ObsidianFixer:
     """
@@ -21,34 +28,178 @@ class ObsidianFixer:
         Returns:
             None
         """
+        ObsidianFixer.update_weblinks_for_renames(file, [(old_file_ref.get_abs_path(), new_file_ref.get_abs_path())])
 
-        if ConfigHelper.excluded_from_indexing(file):
+    @staticmethod
+    def update_weblinks_for_renames(file, renames):
+        """
+        Updates wiki-style links for a whole batch of renames in a single walk over the Markdown files.
+        All renames are applied simultaneously, so each file is read and written at most once. Chains of renames are
+        collapsed first, so a link ends up where applying the renames one by one would take it.
+
+        Args:
+            file: File or directory object to process
+            renames: Iterable of (old_path, new_path) pairs of absolute paths, in the order they were applied. It is
+                     read once, so a SpillQueue streams in without being held in memory
+
+        Returns:
+            None
+        """
+        new_names = ObsidianFixer._collapse_renames(renames)
+        if not new_names:
             return
 
-        if file.is_file() and file.get_extension() in [".md"]:
-            ObsidianFixer._update_weblinks_for_file(file, old_file_ref, new_file_ref)
-        elif file.is_dir():
-            for child_file in file.get_children():
-                ObsidianFixer.update_weblinks(child_file, old_file_ref, new_file_ref)
+        # Pattern to match [[old_name*]] where * is any content before closing brackets.
+        # Longer names come first so that a name is never shadowed by one of its prefixes.
+        escaped_old_names = "|".join(re.escape(old_name) for old_name in sorted(new_names, key=len, reverse=True))
+        pattern = re.compile(fr'\[\[({escaped_old_names})([^\]]*)\]\]')
+
+        ObsidianFixer._update_weblinks(file, pattern, new_names)
+
+    @staticmethod
+    def _collapse_renames(renames):
+        '''
+        Maps every renamed name to its final name, e.g. 12.03 C to 12.01 C for 12.03 C => 12.02 C => 12.01 C. Like
+        applying the renames one by one, a link only follows the first rename of its name and the renames after it.
+        '''
+        new_names = {}
+        old_names_by_new_name = {} # Current name -> names whose links currently point to it
+        for old_path, new_path in renames:
+            old_name, new_name = _get_name_without_extension(old_path), _get_name_without_extension(new_path)
+            linked_names = old_names_by_new_name.pop(old_name, set())
+            if old_name not in new_names:
+                linked_names.add(old_name)
+            for linked_name in linked_names:
+                new_names[linked_name] = new_name
+            old_names_by_new_name.setdefault(new_name, set()).update(linked_names)
+        return new_names
 
     @staticmethod
-    def _update_weblinks_for_file(file, old_file_ref, new_file_ref):
-        old_name = old_file_ref.get_name_without_extension()
-        new_name = new_file_ref.get_name_without_extension()
+    def _update_weblinks(file, pattern, new_names):
+        """
+        Reads the Markdown files on one thread, rewrites their wikilinks on this one and writes them back on another,
+        connected by bounded queues, so disk reads and writes overlap with the matching.
+        """
+        if not ConfigHelper.load_from_config("concurrent_stages"):
+            for markdown_file in ObsidianFixer._iter_markdown_files(file):
+                ObsidianFixer._write_if_changed(markdown_file, markdown_file.read_text(), pattern, new_names)
+            return
 
-        # Pattern to match [[old_name*]] where * is any content before closing brackets
-        escaped_old_name = re.escape(old_name)
-        pattern = fr'\[\[{escaped_old_name}([^\]]*)\]\]'
+        contents = queue.Queue(_MAX_QUEUED_FILES)
+        rewrites = queue.Queue(_MAX_QUEUED_FILES)
+        stopped = threading.Event()
+        errors = []
 
-        # Replacement preserves whatever was after the name
-        replacement = f'[[{new_name}\\1]]'
+        # Both give up once the pipeline stopped, so a failing thread can't leave another one blocked on a queue
+        def put(items, item):
+            while not stopped.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
 
-        with open(file.get_abs_path(), 'r', encoding='utf-8') as f:
-            old_content = f.read()
+        def get(items):
+            while not stopped.is_set():
+                try:
+                    return items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return None
 
-        updated_content = re.sub(pattern, replacement, old_content)
+        def read():
+            try:
+                for markdown_file in ObsidianFixer._iter_markdown_files(file):
+                    if stopped.is_set():
+                        break
+                    put(contents, (markdown_file, markdown_file.read_text()))
+            except Exception as e:
+                errors.append(e)
+            put(contents, None)
 
+        def write():
+            try:
+                while True:
+                    item = rewrites.get()
+                    if item is None:
+                        return
+                    markdown_file, content = item
+                    markdown_file.write_text(content)
+                    ObsidianFixer._record_rewrite(markdown_file)
+            except Exception as e:
+                errors.append(e)
+                stopped.set()
+
+        threads = [threading.Thread(target=read, daemon=True), threading.Thread(target=write, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while not errors:
+                item = get(contents)
+                if item is None:
+                    break
+                markdown_file, old_content = item
+                updated_content = ObsidianFixer._replace_weblinks(old_content, pattern, new_names)
+                if old_content != updated_content:
+                    put(rewrites, (markdown_file, updated_content))
+        finally:
+            put(rewrites, None)
+            stopped.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def _iter_markdown_files(file):
+        """
+        Yields the Markdown files at or below file that aren't excluded, depth first and without recursion. Directories
+        and files reached through several paths, e.g. symlinks or hard links, are only visited once, so a file is never
+        rewritten twice.
+        """
+        visited_ids = set()
+        stack = [iter([file])]
+        while stack:
+            file = next(stack[-1], None)
+            if file is None:
+                stack.pop()
+                continue
+            if ConfigHelper.excluded_from_indexing(file):
+                continue
+            is_markdown_file = file.is_file() and file.get_extension() in [".md"]
+            if not is_markdown_file and not file.is_dir():
+                continue
+
+            file_id = file.get_file_id()
+            if file_id in visited_ids:
+                continue
+            visited_ids.add(file_id)
+
+            if is_markdown_file:
+                yield file
+            else:
+                stack.append(iter(file.get_children()))
+
+    @staticmethod
+    def _replace_weblinks(content, pattern, new_names):
+        # Replacement preserves whatever was after the name
+        def replacement(match):
+            return f'[[{new_names[match.group(1)]}{match.group(2)}]]'
+
+        return pattern.sub(replacement, content)
+
+    @staticmethod
+    def _write_if_changed(file, old_content, pattern, new_names):
+        updated_content = ObsidianFixer._replace_weblinks(old_content, pattern, new_names)
         if old_content != updated_content:
-            with open(file.get_abs_path(), 'w', encoding='utf-8') as f:
-                f.write(updated_content)
-            print(f"Updated references of {old_file_ref.name} in: {file}")
\ No newline at end of file
+            file.write_text(updated_content)
+            ObsidianFixer._record_rewrite(file)
+
+    @staticmethod
+    def _record_rewrite(file):
+        ChangeLog.record(file)
+        RunMetrics.increment("markdown_files_rewritten")
+        RunLog.log("debug", "markdown_rewritten", path=file.get_abs_path())
+
+def _get_name_without_extension(path):
+    return os.path.splitext(os.path.basename(path))[0]
@@ -0,0 +1,3 @@
+from .pipeline import Pipeline, STAGES
+from .vault_pool import VaultPool
+from .concurrent_stages import ConcurrentStages
\ No newline at end of file
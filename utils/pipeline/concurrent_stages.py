@@ -0,0 +1,34 @@
+import threading
+from utils.config import ConfigHelper as ch
+
+class ConcurrentStages:
+    '''
+    Runs stages that don't depend on each other's output at the same time, each in its own thread, so they take as long
+    as the slowest of them rather than their sum. The links stage only rewrites the contents of Markdown files and the
+    jdex stage only reads names, so once the fix stage is done they can overlap. With concurrent_stages off in the
+    config they run one after another.
+    '''
+
+    @staticmethod
+    def run(stages):
+        '''Calls every stage, the first one on the calling thread. Re-raises the first exception once all have finished'''
+        if len(stages) < 2 or not ch.load_from_config("concurrent_stages"):
+            for stage in stages:
+                stage()
+            return
+
+        errors = []
+        def run_stage(stage):
+            try:
+                stage()
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_stage, args=(stage,), daemon=True) for stage in stages[1:]]
+        for thread in threads:
+            thread.start()
+        run_stage(stages[0])
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
\ No newline at end of file
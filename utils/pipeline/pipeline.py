@@ -0,0 +1,113 @@
+import os
+import itertools
+from utils.file import File, CreationRegistry, TreeFingerprint
+from utils.run import ChangeLog, PendingLinks, RenameJournal, RunLock, RunLog, RunMetrics
+from utils.pipeline.concurrent_stages import ConcurrentStages
+
+# Stages always run in this order, whichever subset is selected
+STAGES = ["fix", "links", "jdex", "commit"]
+# Stages of a group don't depend on each other's output, so they run at the same time
+_STAGE_GROUPS = [["fix"], ["links", "jdex"], ["commit"]]
+
+class Pipeline:
+    '''
+    Runs the selected stages over one vault in a single process. All stages share one tree snapshot, classification
+    cache and config. Each stage imports what it needs only when it runs, so an invocation with nothing to do exits quickly.
+    '''
+
+    def __init__(self, root_path, commit_changed_paths_only=False, enable_fscache=False, deadline=None):
+        self.root_file = File.from_abs_path(os.path.abspath(root_path), -1)
+        self.commit_changed_paths_only = commit_changed_paths_only
+        self.enable_fscache = enable_fscache
+        self.deadline = deadline # The fix stage stops at it, and the jdex stage is skipped once it passed
+        self._renames = [] # Renames whose wikilinks haven't been rewritten yet, as [old path, new path]
+
+    def run(self, stages):
+        unknown_stages = [stage for stage in stages if stage not in STAGES]
+        if unknown_stages:
+            raise ValueError(f"Unknown stages {unknown_stages}. Valid stages are {STAGES}")
+
+        # A commit alone must not make a running fix do another pass
+        request_rerun = any(stage != "commit" for stage in stages)
+        RunMetrics.start()
+        status = "failed"
+        try:
+            status = "completed" if RunLock.run_coalesced(self.root_file, lambda: self._run_once(stages), request_rerun,
+                                                          on_locked=lambda: RunLog.start(self.root_file)) else "skipped"
+            if status == "completed":
+                RunMetrics.write(self.root_file)
+        finally:
+            if not RunLog.is_open():
+                RunLog.start(self.root_file, rotate=False) # Another run holds the lock and may be writing the log
+            RunLog.finish(status)
+        return status
+
+    def _run_once(self, stages):
+        RenameJournal.begin(self.root_file)
+        for group in _STAGE_GROUPS:
+            ConcurrentStages.run([lambda stage=stage: self._run_stage(stage) for stage in group if stage in stages])
+        self._finish()
+
+    def _run_stage(self, stage):
+        with RunMetrics.phase(stage):
+            getattr(self, f"_run_{stage}")()
+
+    def _run_fix(self):
+        from fix_indexes import bfs_fix_indexes
+        from utils.index.index_helper import IndexHelper as ih
+
+        areas = ih.get_areas_in_dir(self.root_file)
+        fingerprints = TreeFingerprint(self.root_file, "fix")
+        fingerprints.update()
+        self._renames = bfs_fix_indexes(self.root_file, areas, fingerprints, self.deadline)
+        fingerprints.save()
+
+    def _run_links(self):
+        pending_renames = PendingLinks.pop_all(self.root_file)
+        RenameJournal.log_pending_links(pending_renames)
+        renames = itertools.chain(pending_renames, self._renames)
+        has_renames = bool(pending_renames or self._renames)
+        self._renames = []
+        if not has_renames:
+            return
+
+        from fix_indexes import fix_weblinks
+        fix_weblinks(self.root_file, renames)
+
+    def _run_jdex(self):
+        from create_jdex import create_jdex
+
+        if self.deadline is not None and self.deadline.has_passed():
+            print("Deadline reached, the JDex files are left for the next run.")
+            RunLog.log("info", "jdex_deferred")
+            return
+
+        fingerprints = TreeFingerprint(self.root_file, "jdex")
+        fingerprints.update()
+        create_jdex(self.root_file, fingerprints=fingerprints)
+        fingerprints.save()
+
+    def _run_commit(self):
+        from related_scripts.commit_daily import check_and_commit
+
+        CreationRegistry.flush()
+        ChangeLog.flush(self.root_file)
+        changed_paths_file = ChangeLog.get_log_path(self.root_file) if self.commit_changed_paths_only else None
+
+        # The pipeline already holds the vault's run lock, so no lock file is passed
+        cwd = os.getcwd()
+        try:
+            check_and_commit(self.root_file.get_abs_path(), changed_paths_file, self.enable_fscache)
+        finally:
+            os.chdir(cwd) # check_and_commit runs git from inside the vault
+
+    def _finish(self):
+        if self._renames:
+            from utils.config import ConfigHelper as ch
+            if ch.load_from_config("fix_weblinks"):
+                PendingLinks.save(self.root_file, self._renames)
+            self._renames = []
+            RenameJournal.mark_links_done()
+        CreationRegistry.flush()
+        ChangeLog.flush(self.root_file)
+        RenameJournal.end()
@@ -0,0 +1,80 @@
+import os
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor
+from utils.file import File
+from utils.config import ConfigHelper as ch
+
+_LOGS_DIR_NAME = "logs"
+
+class VaultPool:
+    '''
+    Processes several vaults concurrently, each in its own worker process. Workers don't share any state (snapshots,
+    caches and change logs are per process) and every vault writes its output to its own log in logs/.
+
+    The lock, logs and state of a vault in logs/ are named after its directory, so vaults with the same directory name
+    can't be processed together.
+    '''
+
+    @staticmethod
+    def get_root_paths(root_paths):
+        '''Returns the vaults given on the command line, falling back to the vaults listed in the config'''
+        root_paths = list(root_paths) or ch.load_from_config("vaults") or []
+        root_paths = [os.path.abspath(os.path.expanduser(root_path)) for root_path in root_paths]
+
+        root_paths_by_name = {}
+        for root_path in root_paths:
+            name = os.path.basename(root_path)
+            if name in root_paths_by_name:
+                raise ValueError(f"'{root_paths_by_name[name]}' and '{root_path}' are both named '{name}' and would share "
+                                 f"their lock and state in {_LOGS_DIR_NAME}/. Rename one of them.")
+            root_paths_by_name[name] = root_path
+        return root_paths
+
+    @staticmethod
+    def get_log_path(log_prefix, root_path):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"{log_prefix}_{os.path.basename(root_path)}.log")
+
+    @staticmethod
+    def run(process_vault, root_paths, log_prefix):
+        '''
+        Calls process_vault(root_path) for every vault, at most max_concurrent_vaults at a time. process_vault must be
+        a module level function so that it can be sent to the workers, and returns "skipped" if another run was
+        already processing the vault. Returns the vaults that failed.
+        '''
+        if len(root_paths) == 1:
+            process_vault(root_paths[0])
+            return []
+
+        if ch.load_from_config("prompt_for_approval"):
+            # Workers can't prompt, so vaults are processed one after another in this process
+            for root_path in root_paths:
+                process_vault(root_path)
+            return []
+
+        max_workers = min(ch.load_from_config("max_concurrent_vaults"), len(root_paths))
+        failed_root_paths = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                root_path: executor.submit(_process_vault_with_log, process_vault, root_path, VaultPool.get_log_path(log_prefix, root_path))
+                for root_path in root_paths
+            }
+            for root_path, future in futures.items():
+                status = future.result()
+                if status == "failed":
+                    print(f"Failed to process '{root_path}'. See {VaultPool.get_log_path(log_prefix, root_path)}")
+                    failed_root_paths.append(root_path)
+                elif status == "skipped":
+                    print(f"Skipped '{root_path}', another run is processing it.")
+                else:
+                    print(f"Processed '{root_path}'.")
+
+        return failed_root_paths
+
+def _process_vault_with_log(process_vault, root_path, log_path):
+    with open(log_path, "a", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            return process_vault(root_path)
+        except Exception:
+            traceback.print_exc()
+            return "failed"
\ No newline at end of file
@@ -0,0 +1,9 @@
+from .change_log import ChangeLog
+from .pending_links import PendingLinks
+from .rename_journal import RenameJournal
+from .run_lock import RunLock
+from .spill_queue import SpillQueue
+from .run_metrics import RunMetrics
+from .resume_queue import ResumeQueue
+from .deadline import Deadline
+from .run_log import RunLog
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+from utils.file import File
+
+_LOGS_DIR_NAME = "logs"
+
+class ChangeLog:
+    '''
+    Records every vault path a run renamed, rewrote or deleted. The paths are appended to a per-vault
+    log in logs/ so commit_daily.py can stage exactly those paths instead of scanning the whole work tree.
+    '''
+
+    _changed_paths = set()
+
+    @staticmethod
+    def record(file):
+        ChangeLog.record_path(file.get_abs_path())
+
+    @staticmethod
+    def record_path(abs_path):
+        ChangeLog._changed_paths.add(abs_path)
+
+    @staticmethod
+    def get_log_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"changed_paths_{root_file.name}.txt")
+
+    @staticmethod
+    def flush(root_file):
+        '''Appends the recorded paths, relative to root_file, to the vault's change log'''
+        root_path = root_file.get_abs_path()
+        relative_paths = []
+        for abs_path in sorted(ChangeLog._changed_paths):
+            relative_path = os.path.relpath(abs_path, root_path)
+            if relative_path.startswith(os.pardir):
+                continue
+            relative_paths.append(relative_path)
+        ChangeLog._changed_paths.clear()
+
+        if not relative_paths:
+            return
+
+        with open(ChangeLog.get_log_path(root_file), "a", encoding="utf-8") as f:
+            f.writelines(f"{relative_path}\n" for relative_path in relative_paths)
\ No newline at end of file
@@ -0,0 +1,26 @@
+import re
+import time
+
+_DURATION_PATTERN = re.compile(r'^(?P<amount>[0-9]+(?:\.[0-9]+)?)(?P<unit>[smh]?)$')
+_SECONDS_PER_UNIT = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+class Deadline:
+    '''
+    Wall-clock time a time-boxed run stops taking on work at. Wall-clock rather than monotonic time, so the vaults a
+    pool processes in other processes share the deadline of the invocation that started them.
+    '''
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.time = time.time() + seconds
+
+    @staticmethod
+    def parse(text):
+        '''Returns the Deadline of a duration from now like "1800", "90s", "25m" or "1h"'''
+        match = _DURATION_PATTERN.match(text.strip())
+        if match is None:
+            raise ValueError(f"Invalid duration {text}. Use e.g. 1800, 90s, 25m or 1h")
+        return Deadline(float(match.group("amount")) * _SECONDS_PER_UNIT[match.group("unit")])
+
+    def has_passed(self):
+        return time.time() >= self.time
@@ -0,0 +1,43 @@
+import os
+import json
+from utils.file import File
+from utils.run.spill_queue import SpillQueue
+
+_LOGS_DIR_NAME = "logs"
+
+class PendingLinks:
+    '''
+    Persists renames whose wikilinks have not been rewritten yet, e.g. when only the fix stage ran.
+    The links stage picks them up on its next run.
+    '''
+
+    @staticmethod
+    def get_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"pending_links_{root_file.name}.jsonl")
+
+    @staticmethod
+    def save(root_file, renames):
+        '''Adds renames, as (old path, new path) pairs, to the saved ones'''
+        if not renames:
+            return
+        with open(PendingLinks.get_path(root_file), "a", encoding="utf-8") as f:
+            for old_path, new_path in renames:
+                f.write(json.dumps({"old": old_path, "new": new_path}) + "\n")
+
+    @staticmethod
+    def pop_all(root_file):
+        '''Returns the saved renames as a SpillQueue of [old path, new path] and forgets them'''
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        renames = SpillQueue(ch.load_from_config("max_entries_in_memory"))
+        path = PendingLinks.get_path(root_file)
+        if not os.path.exists(path):
+            return renames
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rename = json.loads(line)
+                    renames.append([rename["old"], rename["new"]])
+        os.remove(path)
+        return renames
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+from utils.file import File
+from utils.run.change_log import ChangeLog
+from utils.run.pending_links import PendingLinks
+from utils.run.run_log import RunLog
+
+_LOGS_DIR_NAME = "logs"
+
+class RenameJournal:
+    '''
+    Append-only write-ahead journal of the renames of a run, in logs/journal_<vault>.jsonl.
+
+    Renames are journaled a batch at a time, with one fsync per batch, before any of them is applied. A run that is
+    killed midway leaves a run without an end record, and the next run rolls it forward before starting: renames that
+    weren't applied yet are applied, and renames whose wikilinks weren't rewritten yet are handed to the links stage.
+    This only reads the interrupted run's records instead of rescanning the vault.
+
+    The journal keeps the last run that renamed anything, so it can be undone.
+
+    Records: begin (run id, undo_of), rename and pending (old and new absolute paths; pending renames were applied by
+    an earlier run and only await their wikilinks), links_done (all renames so far have their wikilinks rewritten or
+    saved for the links stage) and end.
+    '''
+
+    _journal_file = None # Open while a run is open
+
+    @staticmethod
+    def get_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"journal_{root_file.name}.jsonl")
+
+    @staticmethod
+    def begin(root_file, undo_of=None):
+        '''Opens a run. Drops every earlier run except the last one with renames, which stays undoable'''
+        if RenameJournal._journal_file is not None:
+            RenameJournal._journal_file.close() # Left open by a run that raised. It is recovered below
+        RenameJournal.recover(root_file)
+
+        path = RenameJournal.get_path(root_file)
+        runs = _read_runs(path)
+        kept_runs = [run for run in runs if run["renames"]][-1:]
+        if len(kept_runs) != len(runs):
+            _rewrite(path, [record for run in kept_runs for record in run["records"]])
+
+        RenameJournal._journal_file = open(path, "a", encoding="utf-8")
+        RenameJournal._append([{"op": "begin", "run": time.strftime("%Y-%m-%dT%H:%M:%S"), "undo_of": undo_of}])
+
+    @staticmethod
+    def log_renames(renames):
+        '''Journals a batch of (old_file, new_file) renames that are about to be applied. Does nothing outside of a run'''
+        RenameJournal._append([{"op": "rename", "old": old_file.get_abs_path(), "new": new_file.get_abs_path()} for old_file, new_file in renames])
+
+    @staticmethod
+    def log_pending_links(renames):
+        '''Journals (old path, new path) renames applied by an earlier run whose wikilinks this run rewrites. Does nothing outside of a run'''
+        RenameJournal._append([{"op": "pending", "old": old_path, "new": new_path} for old_path, new_path in renames])
+
+    @staticmethod
+    def mark_links_done():
+        RenameJournal._append([{"op": "links_done"}])
+
+    @staticmethod
+    def end():
+        if RenameJournal._journal_file is None:
+            return
+        RenameJournal._append([{"op": "end"}])
+        RenameJournal._journal_file.close()
+        RenameJournal._journal_file = None
+
+    @staticmethod
+    def recover(root_file):
+        '''Rolls an interrupted run forward. Returns the number of renames it had left to apply'''
+        path = RenameJournal.get_path(root_file)
+        runs = _read_runs(path)
+        if not runs or runs[-1]["ended"]:
+            return 0
+
+        run = runs[-1]
+        num_applied = 0
+        for old_path, new_path in run["renames"]:
+            old_file = File.from_abs_path(old_path)
+            new_file = File.from_abs_path(new_path)
+            if old_file.exists() and not new_file.exists():
+                ChangeLog.record(old_file)
+                ChangeLog.record(new_file)
+                old_file.rename(new_file)
+                num_applied += 1
+
+        PendingLinks.save(root_file, run["unlinked"])
+        num_unlinked = len(run["unlinked"])
+
+        # Rewritten rather than appended to, as the interrupted run may have left a torn last line
+        _rewrite(path, [record for run in runs for record in run["records"]] + [{"op": "links_done"}, {"op": "end"}])
+        print(f"Recovered an interrupted run of '{root_file}': applied {num_applied} renames, {num_unlinked} wikilink updates left for the links stage.")
+        RunLog.log("warning", "run_recovered", renames_applied=num_applied, wikilink_updates_left=num_unlinked)
+        return num_applied
+
+    @staticmethod
+    def get_last_run(root_file):
+        '''Returns (run id, undo_of, [(old path, new path)]) of the last completed run with renames, or None'''
+        runs = [run for run in _read_runs(RenameJournal.get_path(root_file)) if run["ended"] and run["renames"]]
+        if not runs:
+            return None
+        begin = runs[-1]["records"][0]
+        return begin["run"], begin.get("undo_of"), runs[-1]["renames"]
+
+    @staticmethod
+    def _append(records):
+        if RenameJournal._journal_file is not None and records:
+            _write_records(RenameJournal._journal_file, records)
+
+def _write_records(journal_file, records):
+    journal_file.writelines(json.dumps(record) + "\n" for record in records)
+    journal_file.flush()
+    os.fsync(journal_file.fileno())
+
+def _rewrite(path, records):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as journal_file:
+        _write_records(journal_file, records)
+    os.replace(temp_path, path)
+
+def _read_runs(path):
+    '''Splits the journal into runs: {"records", "renames", "unlinked", "ended"}'''
+    if not os.path.exists(path):
+        return []
+
+    runs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # Torn by a crash before the batch was fsynced, so it was never applied
+            if record["op"] == "begin":
+                runs.append({"records": [], "renames": [], "unlinked": [], "ended": False})
+            if not runs:
+                continue
+
+            run = runs[-1]
+            run["records"].append(record)
+            if record["op"] in ("rename", "pending"):
+                if record["op"] == "rename":
+                    run["renames"].append((record["old"], record["new"]))
+                run["unlinked"].append((record["old"], record["new"]))
+            elif record["op"] == "links_done":
+                run["unlinked"] = []
+            elif record["op"] == "end":
+                run["ended"] = True
+    return runs
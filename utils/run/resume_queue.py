@@ -0,0 +1,46 @@
+import os
+import json
+from utils.file import File
+
+_LOGS_DIR_NAME = "logs"
+
+class ResumeQueue:
+    '''
+    Persists the directories a time-boxed fix didn't get to before its deadline, so the next run starts with them
+    instead of over from the areas.
+    '''
+
+    @staticmethod
+    def get_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"resume_{root_file.name}.json")
+
+    @staticmethod
+    def save(root_file, dir_files):
+        path = ResumeQueue.get_path(root_file)
+        if not dir_files:
+            ResumeQueue.discard(root_file)
+            return
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump([[dir_file.get_abs_path(), dir_file.level] for dir_file in dir_files], f)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def pop_all(root_file):
+        '''Returns the saved directories and forgets them'''
+        path = ResumeQueue.get_path(root_file)
+        if not os.path.exists(path):
+            return []
+
+        with open(path, "r", encoding="utf-8") as f:
+            dir_files = [File.from_abs_path(abs_path, level) for abs_path, level in json.load(f)]
+        os.remove(path)
+        return dir_files
+
+    @staticmethod
+    def discard(root_file):
+        '''Called once a fix completed, which makes the saved directories moot'''
+        path = ResumeQueue.get_path(root_file)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,81 @@
+import os
+import fcntl
+from utils.file import File, TreeSnapshot
+
+_LOGS_DIR_NAME = "logs"
+
+class RunLock:
+    '''
+    An fcntl lock in logs/ around everything a run does to a vault.
+
+    A run that finds the lock held doesn't start a second scan. It leaves a rerun request and exits, and the run holding
+    the lock does one more pass before releasing it. Overlapping cron runs therefore coalesce into at most one extra pass.
+    '''
+
+    def __init__(self, root_file):
+        self.lock_path = RunLock.get_path(root_file)
+        self.rerun_path = os.path.splitext(self.lock_path)[0] + ".rerun"
+        self._lock_file = None
+
+    @staticmethod
+    def get_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"{root_file.name}.lock")
+
+    def acquire(self):
+        '''Returns False instead of blocking if another run holds the lock'''
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        return True
+
+    def release(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def request_rerun(self):
+        with open(self.rerun_path, "a"):
+            pass
+
+    def take_rerun_request(self):
+        try:
+            os.remove(self.rerun_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def run_coalesced(root_file, run_pass, request_rerun=True, on_locked=None):
+        '''
+        Calls run_pass while holding the vault's lock, and once more if an overlapping run requested a rerun meanwhile.
+        Requests made during that extra pass are left for the next run. If another run holds the lock, leaves it a rerun
+        request (if request_rerun) and returns False. on_locked is called once the lock is held, before the first pass.
+        '''
+        lock = RunLock(root_file)
+        if not lock.acquire():
+            if request_rerun:
+                lock.request_rerun()
+                print(f"Another run is processing '{root_file}'. Requested a rerun from it.")
+            else:
+                print(f"Another run is processing '{root_file}'. Skipping.")
+            return False
+
+        try:
+            if on_locked is not None:
+                on_locked()
+            # This pass covers any request left before it started
+            lock.take_rerun_request()
+            run_pass()
+            if lock.take_rerun_request():
+                print(f"Rerunning '{root_file}' as requested by an overlapping run.")
+                TreeSnapshot.clear() # The rerun has to see what changed during the last pass
+                run_pass()
+        finally:
+            lock.release()
+
+        return True
\ No newline at end of file
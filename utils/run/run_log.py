@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import threading
+from utils.file import File
+from utils.run.run_metrics import RunMetrics
+
+_LOGS_DIR_NAME = "logs"
+_LEVELS = ["debug", "info", "warning"]
+_BUFFER_SIZE = 64 * 1024
+
+class RunLog:
+    '''
+    Structured log of the runs of a vault in logs/run_<vault>.jsonl, one JSON object per line. Actions are logged as
+    events at a level, and only events at or above run_log_level in the config are kept. Lines are buffered and written
+    in blocks rather than one at a time. Every run ends with a summary record: its status, counts, durations and the
+    renames it applied, and one line of it is printed for the cron log.
+
+    Once the log outgrows run_log_max_bytes it is rotated when the next run that holds the vault's lock starts, keeping
+    run_log_backups old logs. Blocks are written whole lines at a time, so a run that was skipped because another holds
+    the lock can add its records meanwhile. Only a summary that outgrows the buffer with its renames is written in several
+    blocks. Events logged outside of a run are dropped.
+    '''
+
+    _log_file = None # Open while a run is open
+    _root_file = None
+    _min_level = 0
+    _rename_queues = [] # The SpillQueues the fix appends its applied renames to, read when the summary is written
+    _lines = [] # Encoded lines not written yet
+    _num_buffered_bytes = 0
+    _lock = threading.Lock() # Stages may log from parallel threads
+
+    @staticmethod
+    def get_path(root_file):
+        return os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"run_{root_file.name}.jsonl")
+
+    @staticmethod
+    def start(root_file, rotate=True):
+        '''Opens the log for a run. Only a run holding the vault's lock may rotate it, as another run may be writing it'''
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        level = ch.load_from_config("run_log_level")
+        if level not in _LEVELS:
+            raise ValueError(f"Invalid run_log_level {level}. Valid levels are {_LEVELS}")
+
+        path = RunLog.get_path(root_file)
+        if rotate:
+            _rotate(path, ch.load_from_config("run_log_max_bytes"), ch.load_from_config("run_log_backups"))
+        RunLog._root_file = root_file
+        RunLog._min_level = _LEVELS.index(level)
+        RunLog._rename_queues = []
+        RunLog._log_file = open(path, "ab", buffering=0)
+        RunLog.log("info", "run_started")
+
+    @staticmethod
+    def is_open():
+        return RunLog._log_file is not None
+
+    @staticmethod
+    def log(level, event, **fields):
+        '''Logs an event, e.g. log("debug", "markdown_rewritten", path=...). Does nothing outside of a run'''
+        if RunLog._log_file is None or _LEVELS.index(level) < RunLog._min_level:
+            return
+        RunLog._write({"event": event, "level": level, **fields})
+
+    @staticmethod
+    def record_renames(renames):
+        '''Adds the renames applied to a SpillQueue of [old path, new path], then and later, to the summary of the run'''
+        if RunLog._log_file is not None:
+            RunLog._rename_queues.append(renames)
+
+    @staticmethod
+    def finish(status):
+        '''Writes the summary record of the run ("completed", "skipped" or "failed") and closes the log'''
+        if RunLog._log_file is None:
+            return
+
+        summary = RunMetrics.get_summary()
+        RunLog._write_summary({"event": "summary", "level": "info", "status": status, **summary})
+        RunLog._log_file.close()
+        RunLog._log_file = None
+        RunLog._rename_queues = []
+
+        counts = summary["counts"]
+        print(f"Run of '{RunLog._root_file}' {status} in {summary['run_duration_seconds']:.1f}s: {counts['renames_applied']} renames, "
+              f"{counts['markdown_files_rewritten']} Markdown files rewritten, {counts['jdex_files_written']} JDex files written.")
+
+    @staticmethod
+    def _write(record):
+        line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "vault": RunLog._root_file.name, **record})
+        with RunLog._lock:
+            RunLog._buffer(line + "\n")
+
+    @staticmethod
+    def _write_summary(record):
+        '''Writes the record with the renames streamed from their queues into it, then flushes'''
+        line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "vault": RunLog._root_file.name, **record})
+        with RunLog._lock:
+            RunLog._buffer(line[:-1] + ', "renames": [')
+            separator = ""
+            for renames in RunLog._rename_queues:
+                for rename in renames:
+                    RunLog._buffer(separator + json.dumps(rename))
+                    separator = ", "
+            RunLog._buffer("]}\n")
+            RunLog._flush()
+
+    @staticmethod
+    def _buffer(text):
+        RunLog._lines.append(text.encode("utf-8"))
+        RunLog._num_buffered_bytes += len(RunLog._lines[-1])
+        if RunLog._num_buffered_bytes >= _BUFFER_SIZE:
+            RunLog._flush()
+
+    @staticmethod
+    def _flush():
+        '''Writes the buffered lines with one appending write, so they never interleave with another run's lines'''
+        RunLog._log_file.write(b"".join(RunLog._lines))
+        RunLog._lines = []
+        RunLog._num_buffered_bytes = 0
+
+def _rotate(path, max_bytes, num_backups):
+    '''Shifts run_<vault>.jsonl to .1, .1 to .2 and so on once it outgrew max_bytes, dropping the oldest'''
+    if not os.path.exists(path) or os.path.getsize(path) < max_bytes:
+        return
+
+    for backup in range(num_backups, 0, -1):
+        source_path = f"{path}.{backup - 1}" if backup > 1 else path
+        if os.path.exists(source_path):
+            os.replace(source_path, f"{path}.{backup}")
+    if os.path.exists(path):
+        os.remove(path) # No backups are kept
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from utils.file import File
+from utils.index.index_helper import IndexHelper as ih
+
+# Per-run values, written as gauges since every run replaces the previous file
+_METRICS = {
+    "directories_scanned": "Directories the fix stage listed",
+    "directories_skipped": "Directories the fix stage skipped because their fingerprint was unchanged",
+    "files_classified": "Files whose index type was classified",
+    "renames_proposed": "Renames proposed by the fix stage",
+    "renames_applied": "Renames applied by the fix stage",
+    "markdown_files_rewritten": "Markdown files whose wikilinks were rewritten",
+    "jdex_files_written": "JDex files written",
+    "jdex_files_skipped": "JDex files kept because their directory was unchanged",
+}
+_NOT_INDEXED_METRIC = "not_indexed_files"
+
+class RunMetrics:
+    '''
+    Collects counters and phase durations of a run and writes them to a Prometheus textfile collector file, so runs
+    from cron can be graphed and alerted on, e.g. when the runtime grows with the vault or a run mass-renames files.
+
+    The file is written atomically to <metrics_dir>/johnny_<vault>.prom once a run completes. NOT INDEXED counts are
+    only computed while the vault's JDex is regenerated, so they are carried over from the previous file otherwise.
+    '''
+
+    _counts = Counter()
+    _not_indexed_counts = None # Area name -> NOT INDEXED files, None unless the vault's JDex was regenerated
+    _phase_durations = Counter()
+    _start_time = None
+    _num_classified_at_start = 0
+    _lock = threading.Lock() # Stages may run in parallel threads
+
+    @staticmethod
+    def start():
+        RunMetrics._counts.clear()
+        RunMetrics._not_indexed_counts = None
+        RunMetrics._phase_durations.clear()
+        RunMetrics._start_time = time.monotonic()
+        RunMetrics._num_classified_at_start = ih.num_classified
+
+    @staticmethod
+    def increment(name, amount=1):
+        if name not in _METRICS:
+            raise ValueError(f"Unknown metric {name}")
+        with RunMetrics._lock:
+            RunMetrics._counts[name] += amount
+
+    @staticmethod
+    def start_not_indexed_count():
+        '''Called when the JDex covering the whole vault is regenerated'''
+        RunMetrics._not_indexed_counts = Counter()
+
+    @staticmethod
+    def count_not_indexed(area_name, amount=1):
+        with RunMetrics._lock:
+            if RunMetrics._not_indexed_counts is not None:
+                RunMetrics._not_indexed_counts[area_name] += amount
+
+    @staticmethod
+    @contextmanager
+    def phase(name):
+        '''Adds the time spent in the with block to the duration of the phase'''
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            with RunMetrics._lock:
+                RunMetrics._phase_durations[name] += time.monotonic() - start_time
+
+    @staticmethod
+    def get_summary():
+        '''Counts and durations of the run so far'''
+        with RunMetrics._lock:
+            counts = {name: RunMetrics._counts[name] for name in _METRICS}
+            counts["files_classified"] = ih.num_classified - RunMetrics._num_classified_at_start
+            phase_durations = dict(RunMetrics._phase_durations)
+        run_duration = time.monotonic() - RunMetrics._start_time if RunMetrics._start_time is not None else 0.0
+        return {"run_duration_seconds": run_duration, "phase_duration_seconds": phase_durations, "counts": counts}
+
+    @staticmethod
+    def get_path(root_file):
+        from utils.config import ConfigHelper as ch # utils.config depends on utils.file
+
+        metrics_dir = os.path.join(File.get_root_path(), ch.load_from_config("metrics_dir"))
+        return os.path.join(metrics_dir, f"johnny_{root_file.name}.prom")
+
+    @staticmethod
+    def write(root_file):
+        path = RunMetrics.get_path(root_file)
+        vault = _escape_label(root_file.name)
+        RunMetrics._counts["files_classified"] = ih.num_classified - RunMetrics._num_classified_at_start
+
+        lines = []
+        _add_metric(lines, "last_run_timestamp_seconds", "Unix time the last run completed", [(f'vault="{vault}"', time.time())])
+        run_duration = time.monotonic() - RunMetrics._start_time if RunMetrics._start_time is not None else 0.0
+        _add_metric(lines, "run_duration_seconds", "Duration of the last run", [(f'vault="{vault}"', run_duration)])
+        _add_metric(lines, "phase_duration_seconds", "Duration of each phase of the last run",
+                    [(f'vault="{vault}",phase="{_escape_label(phase)}"', duration) for phase, duration in sorted(RunMetrics._phase_durations.items())])
+        for name, help_text in _METRICS.items():
+            _add_metric(lines, name, help_text, [(f'vault="{vault}"', RunMetrics._counts[name])])
+
+        if RunMetrics._not_indexed_counts is not None:
+            samples = [(f'vault="{vault}",area="{_escape_label(area)}"', count) for area, count in sorted(RunMetrics._not_indexed_counts.items())]
+            _add_metric(lines, _NOT_INDEXED_METRIC, "Files marked NOT INDEXED in the JDex, per area", samples)
+        else:
+            lines += _read_metric_lines(path, _NOT_INDEXED_METRIC)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp" # The collector only reads *.prom files
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{line}\n" for line in lines)
+        os.replace(temp_path, path)
+
+def _add_metric(lines, name, help_text, samples):
+    lines.append(f"# HELP johnny_{name} {help_text}")
+    lines.append(f"# TYPE johnny_{name} gauge")
+    lines += [f"johnny_{name}{{{labels}}} {value}" for labels, value in samples]
+
+def _read_metric_lines(path, name):
+    '''Returns the lines of one metric, including its HELP and TYPE lines, from a previously written file'''
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        prefixes = (f"johnny_{name}{{", f"# HELP johnny_{name} ", f"# TYPE johnny_{name} ")
+        return [line.rstrip("\n") for line in f if line.startswith(prefixes)]
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
@@ -0,0 +1,82 @@
+import json
+import tempfile
+from collections import deque
+
+class SpillQueue:
+    '''
+    First-in first-out queue of JSON-serialisable items that holds at most max_in_memory items in memory. Once that is
+    exceeded, further items are appended to an anonymous temporary file and read back in order as the queue drains,
+    so the memory a traversal needs doesn't grow with the size of the vault.
+    '''
+
+    def __init__(self, max_in_memory):
+        self.max_in_memory = max(1, max_in_memory)
+        self._memory = deque()
+        self._spill_file = None
+        self._num_spilled = 0
+        self._read_offset = 0
+
+    def __len__(self):
+        return len(self._memory) + self._num_spilled
+
+    def append(self, item):
+        # Items may only go to memory while nothing is spilled, otherwise they'd overtake the spilled ones
+        if self._num_spilled == 0 and len(self._memory) < self.max_in_memory:
+            self._memory.append(item)
+            return
+
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile()
+        self._spill_file.seek(0, 2)
+        self._spill_file.write((json.dumps(item) + "\n").encode("utf-8"))
+        self._num_spilled += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iter__(self):
+        '''Iterates over the items in order without removing them'''
+        yield from list(self._memory)
+        position = self._read_offset
+        for _ in range(self._num_spilled):
+            # Sought for every item, as appending moves the file position in between
+            self._spill_file.seek(position)
+            line = self._spill_file.readline()
+            position = self._spill_file.tell()
+            yield json.loads(line)
+
+    def popleft(self):
+        if not self._memory:
+            self._read_spilled()
+        return self._memory.popleft()
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self._memory.clear()
+        self._num_spilled = 0
+        self._read_offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_spilled(self):
+        if self._num_spilled == 0:
+            raise IndexError("pop from an empty SpillQueue")
+
+        self._spill_file.seek(self._read_offset)
+        while self._num_spilled and len(self._memory) < self.max_in_memory:
+            self._memory.append(json.loads(self._spill_file.readline()))
+            self._num_spilled -= 1
+        self._read_offset = self._spill_file.tell()
+
+        if self._num_spilled == 0:
+            # Everything was read back, so the file can be reused from the start
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._read_offset = 0
@@ -0,0 +1 @@
+from .index_server import IndexServer
\ No newline at end of file
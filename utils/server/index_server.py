@@ -0,0 +1,237 @@
+import os
+import json
+import socket
+import inspect
+import threading
+import socketserver
+from contextlib import contextmanager
+from utils.file import File, FileSystem, TreeSnapshot, CreationRegistry
+from utils.index.index_helper import IndexHelper as ih
+from utils.index.index_fixer import IndexFixer as idx_f
+from utils.index.jd_index import JDIndex
+from utils.config import ConfigHelper as ch
+from utils.run import ChangeLog, RenameJournal, RunLock
+
+_LOGS_DIR_NAME = "logs"
+
+# JSON-RPC 2.0 error codes
+_PARSE_ERROR = -32700
+_INVALID_REQUEST = -32600
+_METHOD_NOT_FOUND = -32601
+_INVALID_PARAMS = -32602
+_SERVER_ERROR = -32000
+
+class IndexServer:
+    '''
+    Long-running JSON-RPC 2.0 server for one vault over a Unix domain socket, one request or response per line.
+
+    The tree snapshot, classification cache, config and an index of IDs stay warm between requests, so editor plugins
+    and scripts get answers in milliseconds instead of paying a cold start and a full vault walk per call. Requests
+    are handled one at a time, and requests that modify the vault also take the vault's run lock.
+
+    Methods (paths are relative to the vault or absolute):
+    - reindex(path): Fixes the indexes below a directory without asking for approval and rewrites the wikilinks of
+      the renamed files.
+    - propose_id(dir_path, name): Name a new note called name in dir_path would get.
+    - regenerate_jdex(area): Regenerates the JDex of an area (and the vault's JDex).
+    - resolve_id(index): Path of the file with the given index, or null.
+    - invalidate(path=None): Forgets what is cached about path (or the whole vault) after external changes.
+    '''
+
+    def __init__(self, root_path, socket_path=None):
+        self.root_file = File.from_abs_path(os.path.abspath(root_path), -1)
+        if socket_path is None:
+            socket_path = os.path.join(File.get_root_path(), _LOGS_DIR_NAME, f"{self.root_file.name}.sock")
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._ids = None # Index -> relative path, built lazily from the tree snapshot
+        self._methods = {
+            "reindex": self.reindex,
+            "propose_id": self.propose_id,
+            "regenerate_jdex": self.regenerate_jdex,
+            "resolve_id": self.resolve_id,
+            "invalidate": self.invalidate,
+        }
+        self._server = None
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise RuntimeError(f"A server is already listening on {self.socket_path}")
+            os.remove(self.socket_path) # Left behind by a previous server
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _RequestHandler)
+        self._server.index_server = self
+        self._server.daemon_threads = True
+        print(f"Serving '{self.root_file}' on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.remove(self.socket_path)
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def handle_request(self, line):
+        '''Returns the JSON-RPC response for one request line'''
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error_response(None, _PARSE_ERROR, str(e))
+        if not isinstance(request, dict):
+            return _error_response(None, _INVALID_REQUEST, "Invalid Request") # e.g. a batch, which isn't supported
+
+        request_id = request.get("id")
+        method = self._methods.get(request.get("method"))
+        if method is None:
+            return _error_response(request_id, _METHOD_NOT_FOUND, f"Unknown method {request.get('method')}")
+
+        params = request.get("params", {})
+        try:
+            arguments = inspect.signature(method).bind(*params) if isinstance(params, list) else inspect.signature(method).bind(**params)
+        except TypeError as e:
+            return _error_response(request_id, _INVALID_PARAMS, str(e))
+
+        with self._lock:
+            try:
+                result = method(*arguments.args, **arguments.kwargs)
+            except Exception as e:
+                return _error_response(request_id, _SERVER_ERROR, f"{type(e).__name__}: {e}")
+
+        return {"jsonrpc": "2.0", "result": result, "id": request_id}
+
+    ### Methods
+    def reindex(self, path):
+        from fix_indexes import bfs_fix_indexes, fix_weblinks
+
+        dir_file = self._get_file(path)
+        if not dir_file.is_dir():
+            raise ValueError(f"'{path}' is not a directory")
+
+        TreeSnapshot.invalidate(dir_file.get_abs_path())
+        with self._modifying_vault():
+            renames = bfs_fix_indexes(self.root_file, [dir_file], interactive=False) # Nobody could answer a prompt
+            fix_weblinks(self.root_file, renames)
+
+        root_path = self.root_file.get_abs_path()
+        return [{"old": os.path.relpath(old_path, root_path), "new": os.path.relpath(new_path, root_path)} for old_path, new_path in renames]
+
+    def propose_id(self, dir_path, name):
+        dir_file = self._get_file(dir_path)
+        TreeSnapshot.invalidate(dir_file.get_abs_path())
+        return idx_f.propose_index_for_new_file(dir_file.create_child(name)).name
+
+    def regenerate_jdex(self, area):
+        from create_jdex import regenerate_jdex
+
+        area_file = self._get_file(area)
+        if not ih.is_area(area_file, proper = True):
+            raise ValueError(f"'{area}' is not an area")
+
+        TreeSnapshot.invalidate(area_file.get_abs_path())
+        with self._modifying_vault():
+            regenerate_jdex(self.root_file, [area_file])
+        return self._get_relative_path(area_file.create_child(f"Index of {area_file.name}.md"))
+
+    def resolve_id(self, index):
+        path = self._resolve_id(index)
+        if path is not None and not FileSystem.get_active().exists(self._get_file(path).get_abs_path()):
+            # Renamed since the snapshot was taken, e.g. by a cron run in another process
+            TreeSnapshot.clear()
+            self._ids = None
+            path = self._resolve_id(index)
+        return path
+
+    def invalidate(self, path=None):
+        if path is None:
+            TreeSnapshot.clear()
+            CreationRegistry.clear()
+            ch.reload()
+        else:
+            TreeSnapshot.invalidate(self._get_file(path).get_abs_path())
+        self._ids = None
+        return True
+
+    ### Helpers
+    @contextmanager
+    def _modifying_vault(self):
+        lock = RunLock(self.root_file)
+        if not lock.acquire():
+            raise RuntimeError("Another run is processing the vault. Retry later.")
+        try:
+            RenameJournal.begin(self.root_file)
+            yield
+            CreationRegistry.flush()
+            ChangeLog.flush(self.root_file)
+            RenameJournal.end()
+        finally:
+            self._ids = None
+            lock.release()
+
+    def _resolve_id(self, index):
+        # An index that encodes its ancestry is found by walking down from its area instead of collecting every ID
+        jd_index = JDIndex.parse(index)
+        if jd_index is not None:
+            file = self._find_by_ancestry(jd_index)
+            if file is not None:
+                return self._get_relative_path(file)
+
+        # Collected again after invalidate or a stale hit, not for every unknown index
+        if self._ids is None:
+            self._ids = self._collect_ids()
+        return self._ids.get(index)
+
+    def _get_file(self, path):
+        abs_path = os.path.normpath(os.path.join(self.root_file.get_abs_path(), path))
+        relative_path = os.path.relpath(abs_path, self.root_file.get_abs_path())
+        if relative_path.startswith(os.pardir):
+            raise ValueError(f"'{path}' is outside of the vault")
+
+        level = -1 if relative_path == os.curdir else relative_path.count(os.sep)
+        return File.from_abs_path(abs_path, level)
+
+    def _get_relative_path(self, file):
+        return os.path.relpath(file.get_abs_path(), self.root_file.get_abs_path())
+
+    def _find_by_ancestry(self, jd_index):
+        file = self.root_file
+        for ancestor in jd_index.ancestors():
+            if not file.is_dir():
+                return None
+            file = next((child for child in file.get_children() if ih.get_jd_index(child) == ancestor), None)
+            if file is None:
+                return None
+        return file
+
+    def _collect_ids(self):
+        ids = {}
+        stack = ih.get_areas_in_dir(self.root_file)
+        while stack:
+            file = stack.pop()
+            index = file.index() if file.is_indexed(proper = True) else None
+            if index is not None:
+                ids.setdefault(index, self._get_relative_path(file))
+            if file.is_dir():
+                stack.extend(file.get_children())
+        return ids
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.index_server.handle_request(line)
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+def _is_listening(socket_path):
+    '''Whether a live server answers on the socket, as opposed to one left behind by a server that died'''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+
+def _error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": request_id}
\ No newline at end of file